@@ -0,0 +1,153 @@
+"""
+Process-wide audio byte cache and file index for the evaluation form.
+
+The index is built once per process from final_dataset.json and records, for
+every referenced path, whether it exists, which file is actually served (the
+compressed variant when available) and its MIME type and size. Audio bytes
+are kept in a size-bounded LRU cache shared by all sessions, so reruns of the
+form do no filesystem I/O once the cache is warm.
+
+When AUDIO_BASE_URL is set the form references content-hashed static URLs
+instead (see audio_server.py), so no audio bytes pass through Streamlit.
+"""
+
+import html
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataset_index import DATASET_PATH, load_dataset_index
+from transcode_audio import compressed_variant, file_sha256
+from metrics import register_collector
+
+_index = None
+_index_lock = threading.Lock()
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_bytes = 0
+_cache_stats = {
+    'hits': 0,
+    'misses': 0,
+    'evictions': 0,
+    'prefetched': 0,
+}
+_prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-prefetch")
+
+def _max_bytes():
+    return int(float(os.getenv('AUDIO_CACHE_MAX_MB', '64')) * 1024 * 1024)
+
+def build_audio_index(dataset_path=DATASET_PATH):
+    """Stat every audio path in the dataset once and return the index"""
+    index = {}
+    for path in load_dataset_index(dataset_path).audio_paths():
+        served_path, mime = compressed_variant(path)
+        exists = os.path.exists(served_path)
+        index[path] = {
+            'exists': exists,
+            'served_path': served_path,
+            'mime': mime,
+            'size': os.path.getsize(served_path) if exists else 0,
+        }
+    return index
+
+def get_audio_index():
+    """Return the per-process audio index, building it on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = build_audio_index()
+    return _index
+
+def audio_exists(path):
+    """True if path (or its compressed variant) is available"""
+    entry = get_audio_index().get(path)
+    return bool(entry and entry['exists'])
+
+def get_audio(path):
+    """Return (bytes, mime) for path, reading the file only on a cache miss"""
+    global _cache_bytes
+    entry = get_audio_index()[path]
+    served_path = entry['served_path']
+
+    with _cache_lock:
+        data = _cache.get(served_path)
+        if data is not None:
+            _cache.move_to_end(served_path)
+            _cache_stats['hits'] += 1
+            return data, entry['mime']
+        _cache_stats['misses'] += 1
+
+    with open(served_path, 'rb') as f:
+        data = f.read()
+
+    limit = _max_bytes()
+    with _cache_lock:
+        if served_path not in _cache and len(data) <= limit:
+            _cache[served_path] = data
+            _cache_bytes += len(data)
+            while _cache_bytes > limit:
+                _, evicted = _cache.popitem(last=False)
+                _cache_bytes -= len(evicted)
+                _cache_stats['evictions'] += 1
+    return data, entry['mime']
+
+def static_path(path):
+    """Content-hashed URL path (<sha256 prefix>/<file name>) of the served file"""
+    entry = get_audio_index()[path]
+    if 'sha256' not in entry:
+        entry['sha256'] = file_sha256(entry['served_path'])
+    return f"{entry['sha256'][:16]}/{os.path.basename(entry['served_path'])}"
+
+def audio_url(path):
+    """Return (url, mime) under AUDIO_BASE_URL, or (None, None) when it is not set"""
+    base_url = os.getenv('AUDIO_BASE_URL')
+    if not base_url:
+        return None, None
+    return f"{base_url.rstrip('/')}/{static_path(path)}", get_audio_index()[path]['mime']
+
+def prefetch_links(paths):
+    """<link rel="prefetch"> tags for the static URLs of paths, so the browser caches them"""
+    tags = []
+    for path in paths:
+        if audio_exists(path):
+            url, _ = audio_url(path)
+            tags.append(f'<link rel="prefetch" href="{html.escape(url)}">')
+    return "\n".join(tags)
+
+def _prefetch(paths):
+    for path in paths:
+        if not audio_exists(path):
+            continue
+        served_path = get_audio_index()[path]['served_path']
+        with _cache_lock:
+            if served_path in _cache:
+                continue
+        try:
+            get_audio(path)
+            with _cache_lock:
+                _cache_stats['prefetched'] += 1
+        except Exception as e:
+            print(f"Audio prefetch failed for {path}: {str(e)}")
+
+def prefetch_audio(paths):
+    """Load paths into the cache in the background"""
+    _prefetcher.submit(_prefetch, tuple(paths))
+
+def load_audio(paths):
+    """Load paths into the cache now (used by the start-up warm-up)"""
+    _prefetch(tuple(paths))
+
+def get_audio_cache_stats():
+    """Return hit/miss/eviction counters and memory usage"""
+    with _cache_lock:
+        return dict(
+            _cache_stats,
+            entries=len(_cache),
+            bytes=_cache_bytes,
+            max_bytes=_max_bytes(),
+            indexed_files=len(_index) if _index is not None else 0,
+        )
+
+register_collector('audio_cache', get_audio_cache_stats)
@@ -0,0 +1,159 @@
+"""
+Static HTTP server for the dataset audio.
+
+Every file the form plays (the compressed variant when available, see
+transcode_audio.py) is served under a content-hashed path,
+/<sha256 prefix>/<file name>, with an ETag and
+"Cache-Control: public, max-age=31536000, immutable". A changed file gets a
+new URL, so browsers and reverse proxies can keep clips forever. Single byte
+ranges are supported for seeking.
+
+Usage:
+    python audio_server.py [--host 0.0.0.0] [--port 8502]
+
+and point the app at it with AUDIO_BASE_URL=http://<host>:8502 (or at a
+reverse proxy in front of it).
+"""
+
+import argparse
+import os
+import re
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from audio_cache import get_audio_index, static_path
+from startup import load_env
+
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+CHUNK_SIZE = 64 * 1024
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def build_routes():
+    """Map every content-hashed URL path to (file path, mime, size, etag)"""
+    routes = {}
+    for path, entry in get_audio_index().items():
+        if not entry['exists']:
+            continue
+        url_path = static_path(path)
+        routes['/' + url_path] = (
+            entry['served_path'],
+            entry['mime'],
+            entry['size'],
+            f'"{entry["sha256"]}"',
+        )
+    return routes
+
+def parse_range(header, size):
+    """Return (start, end) of a single byte range, or None for the whole file.
+
+    Raises ValueError when the range cannot be satisfied.
+    """
+    match = _RANGE.match(header.strip())
+    if not match:
+        # Multiple or malformed ranges: serve the whole file
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+class AudioRequestHandler(BaseHTTPRequestHandler):
+    routes = {}
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _send_common_headers(self, etag):
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', CACHE_CONTROL)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Access-Control-Allow-Origin', '*')
+
+    def _serve(self, send_body):
+        route = self.routes.get(self.path.split('?', 1)[0])
+        if route is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        file_path, mime, size, etag = route
+
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self._send_common_headers(etag)
+            self.end_headers()
+            return
+
+        byte_range = None
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        if range_header and (not if_range or if_range == etag):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self._send_common_headers(etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1
+        self.send_response(HTTPStatus.PARTIAL_CONTENT if byte_range else HTTPStatus.OK)
+        self.send_header('Content-Type', mime)
+        self.send_header('Content-Length', str(length))
+        if byte_range:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self._send_common_headers(etag)
+        self.end_headers()
+
+        if not send_body:
+            return
+        try:
+            with open(file_path, 'rb') as f:
+                f.seek(start)
+                remaining = length
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            # The player cancelled the request (e.g. when seeking)
+            pass
+
+def serve(host, port, routes):
+    """Serve routes until interrupted"""
+    AudioRequestHandler.routes = routes
+    server = ThreadingHTTPServer((host, port), AudioRequestHandler)
+    print(f"Serving {len(AudioRequestHandler.routes)} audio files on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main(argv=None):
+    # Same settings as the app, so both pick the same served variant per clip
+    load_env()
+    parser = argparse.ArgumentParser(description="Serve dataset audio as immutable static files")
+    parser.add_argument('--host', default=os.getenv('AUDIO_SERVER_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('AUDIO_SERVER_PORT', '8502')))
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, build_routes())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Query-plan verification for database.py.
+
+Seeds the Postgres database with synthetic participants and evaluations, calls
+every database.py function and runs EXPLAIN (ANALYZE, BUFFERS) for each
+statement it executes. Sequential scans on tables that grow with the number
+of participants are flagged, except in functions that read whole tables by
+design. Everything runs in one transaction that is rolled back at the end, so
+the tool leaves the database unchanged (apart from init_database() applying
+pending schema migrations first).
+
+Usage (from the repository root, with the DB_* settings of a dev database):
+    python benchmarks/explain_queries.py --participants 20000
+    python benchmarks/explain_queries.py --output benchmarks/results/plans.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import database
+from dataset_index import load_dataset_index
+
+# Tables whose size does not depend on the number of participants
+BOUNDED_TABLES = {'rating_rollups', 'schema_migrations', 'dataset_manifests'}
+
+# Functions that return or aggregate every row, where a full scan is expected
+FULL_SCAN_FUNCTIONS = {
+    'get_all_evaluations',
+    'iter_rating_export',
+    'get_evaluation_statistics',
+    'rebuild_rating_rollups',
+    'compact_evaluations',
+}
+
+EXPLAINED_STATEMENTS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+class ExplainCursor:
+    """Cursor wrapper that records the plan of every statement before running it"""
+
+    def __init__(self, recorder, conn, cursor):
+        object.__setattr__(self, '_recorder', recorder)
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_cursor', cursor)
+
+    def execute(self, sql, params=None):
+        if sql.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+            with self._conn.cursor() as explain:
+                explain.execute("SAVEPOINT explain_statement")
+                explain.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+                plan = explain.fetchone()[0][0]
+                explain.execute("ROLLBACK TO SAVEPOINT explain_statement")
+            self._recorder(sql, plan)
+        return self._cursor.execute(sql, params)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+class ExplainConnection:
+    """One shared connection; commits are no-ops so the seed can be rolled back"""
+
+    def __init__(self, conn, recorder):
+        self._conn = conn
+        self._recorder = recorder
+
+    def cursor(self, *args, **kwargs):
+        return ExplainCursor(self._recorder, self._conn, self._conn.cursor(*args, **kwargs))
+
+    def commit(self):
+        with self._conn.cursor() as cur:
+            cur.execute("RELEASE SAVEPOINT explain_call")
+            cur.execute("SAVEPOINT explain_call")
+
+    def rollback(self):
+        with self._conn.cursor() as cur:
+            cur.execute("ROLLBACK TO SAVEPOINT explain_call")
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+def seed(conn, participants):
+    """Insert synthetic participants with one full evaluation each"""
+    index = load_dataset_index()
+    template = index.encode_ratings(dict.fromkeys(index.rating_keys, 3))
+    database.store_manifest(index.version)
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO participants (name, email, created_at)
+            SELECT 'Seed ' || g, 'seed-' || g || '@example.com',
+                   CURRENT_TIMESTAMP - g * INTERVAL '1 second'
+            FROM generate_series(1, %s) AS g
+        """, (participants,))
+        cur.execute("""
+            INSERT INTO evaluations (participant_id, evaluation_data, created_at)
+            SELECT id, %s::jsonb, created_at
+            FROM participants
+            WHERE email LIKE 'seed-%%@example.com'
+        """, (json.dumps(template),))
+        cur.execute("ANALYZE participants")
+        cur.execute("ANALYZE evaluations")
+    return index, template
+
+def walk(node):
+    """Yield every node of an EXPLAIN JSON plan"""
+    yield node
+    for child in node.get('Plans', []):
+        yield from walk(child)
+
+def summarize_plan(plan):
+    """Node types, sequentially scanned tables and timings of one plan"""
+    nodes = list(walk(plan['Plan']))
+    return {
+        'nodes': sorted({node['Node Type'] for node in nodes}),
+        'seq_scans': sorted({
+            node['Relation Name'] for node in nodes
+            if node['Node Type'] == 'Seq Scan' and node.get('Relation Name')
+        }),
+        'planning_ms': round(plan.get('Planning Time', 0.0), 3),
+        'execution_ms': round(plan.get('Execution Time', 0.0), 3),
+    }
+
+def deep_cursor(position):
+    """(created_at, id) keyset cursor of a seeded participant"""
+    with database.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT created_at, id FROM participants WHERE email = %s",
+            (f"seed-{position}@example.com",)
+        )
+        return cur.fetchone()
+
+def calls(index, template, participants):
+    """(function name, thunk) for every database.py query path"""
+    email = f"seed-{participants // 2}@example.com"
+    token = uuid.uuid4().hex
+    ratings = dict.fromkeys(index.rating_keys, 3)
+    return [
+        ('check_participant_exists', lambda: database.check_participant_exists(email)),
+        ('submit_evaluation', lambda: database.submit_evaluation('Explain', email, template)),
+        ('submit_evaluations_batch', lambda: database.submit_evaluations_batch([{
+            'submission_key': uuid.uuid4().hex, 'name': 'Explain',
+            'email': 'explain-batch@example.com', 'evaluation_data': template,
+        }])),
+        ('save_draft', lambda: database.save_draft(token, 'Explain', 'explain-draft@example.com', ratings)),
+        ('get_draft', lambda: database.get_draft(token)),
+        ('promote_draft', lambda: database.promote_draft(
+            token, 'Explain', 'explain-draft@example.com', {}, index.version
+        )),
+        ('assign_samples', lambda: database.assign_samples(
+            token, [(sample.sample_type, sample.index) for _, sample in index.iter_samples()],
+            3, {'sunda': 1, 'indonesian': 1}
+        )),
+        ('save_participant', lambda: database.save_participant('Explain', 'explain-legacy@example.com')),
+        ('get_rating_rows', lambda: database.get_rating_rows(participants - 5, [participants - 4])),
+        ('get_participants_page', lambda: database.get_participants_page()),
+        ('get_participants_page', lambda: database.get_participants_page(
+            deep_cursor(participants // 2)
+        )),
+        ('get_all_evaluations', lambda: database.get_all_evaluations()),
+        ('iter_rating_export', lambda: sum(1 for _ in database.iter_rating_export())),
+        ('get_evaluation_statistics', lambda: database.get_evaluation_statistics()),
+        ('rebuild_rating_rollups', lambda: database.rebuild_rating_rollups()),
+        ('compact_evaluations', lambda: database.compact_evaluations(index.version)),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN every database.py query against seeded data")
+    parser.add_argument('--participants', type=int, default=20000)
+    parser.add_argument('--output', help="write the plans summary as JSON")
+    args = parser.parse_args()
+
+    database.init_database()
+    conn = database.get_db_connection()
+    results = []
+    current = {}
+
+    def record(sql, plan):
+        summary = summarize_plan(plan)
+        summary['function'] = current['name']
+        summary['statement'] = ' '.join(sql.split())[:120]
+        growing = [t for t in summary['seq_scans'] if t not in BOUNDED_TABLES]
+        summary['flagged'] = bool(growing) and current['name'] not in FULL_SCAN_FUNCTIONS
+        results.append(summary)
+
+    @contextmanager
+    def explain_connection():
+        with conn.cursor() as cur:
+            cur.execute("SAVEPOINT explain_call")
+        yield ExplainConnection(conn, record)
+
+    original = database.db_connection
+    database.db_connection = explain_connection
+    try:
+        start = time.perf_counter()
+        # seed() stores the dataset manifest through the patched connection
+        current['name'] = 'seed'
+        index, template = seed(conn, args.participants)
+        print(f"Seeded {args.participants} participants in {time.perf_counter() - start:.1f}s")
+        for name, call in calls(index, template, args.participants):
+            current['name'] = name
+            call()
+    finally:
+        database.db_connection = original
+        conn.rollback()
+        conn.close()
+
+    flagged = [r for r in results if r['flagged']]
+    for r in results:
+        marker = '⚠️ ' if r['flagged'] else '   '
+        scans = f" seq scan: {', '.join(r['seq_scans'])}" if r['seq_scans'] else ''
+        print(f"{marker}{r['function']:<26} {r['execution_ms']:>9.2f} ms  {r['statement'][:60]}{scans}")
+    print(f"\n{len(results)} statements explained, {len(flagged)} unexpected sequential scan(s)")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({'participants': args.participants, 'statements': results}, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 1 if flagged else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""
+Concurrent-participant load test for the evaluation form.
+
+Drives main.py and pages/1_Statistik.py headlessly through Streamlit's
+AppTest. Each simulated participant loads the form, clicks every rating
+radio, submits and then opens the statistics page. Participants run
+concurrently in worker processes (each one a separate Streamlit runtime,
+like separate sessions hitting the same database) against the embedded
+SQLite backend, or Postgres with --backend postgres.
+
+Usage (from the repository root):
+    python benchmarks/load_test.py --participants 20 --concurrency 5
+    python benchmarks/load_test.py --output benchmarks/results/new.json \
+        --baseline benchmarks/results/old.json
+
+Reports p50/p95/p99 rerun, submit and statistics-page latency, database
+statements per submit (measured on a lone calibration participant) and peak
+RSS, and writes them as JSON.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_statements = {'count': 0}
+_statements_lock = threading.Lock()
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+def summarize(values):
+    """Latency summary in milliseconds"""
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        'p50_ms': round(percentile(values, 50) * 1000, 3),
+        'p95_ms': round(percentile(values, 95) * 1000, 3),
+        'p99_ms': round(percentile(values, 99) * 1000, 3),
+        'max_ms': round(max(values) * 1000, 3) if values else 0.0,
+    }
+
+def install_statement_counter(backend):
+    """Count database statements issued by this process"""
+    if backend == 'sqlite':
+        import sqlite_database
+
+        original = sqlite_database.get_db_connection
+
+        def counting_connection():
+            conn = original()
+            conn.set_trace_callback(_count_statement)
+            return conn
+
+        sqlite_database.get_db_connection = counting_connection
+    else:
+        import database
+        from contextlib import contextmanager
+
+        original = database.db_connection
+
+        @contextmanager
+        def counting_connection():
+            with original() as conn:
+                yield _CountingConnection(conn)
+
+        database.db_connection = counting_connection
+
+class _CountingCursor:
+    """psycopg2 cursor proxy counting every statement sent to the server"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        _count_statement(None)
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, query, params_seq):
+        params_seq = list(params_seq)
+        for _ in params_seq:
+            _count_statement(None)
+        return self._cursor.executemany(query, params_seq)
+
+    def copy_expert(self, *args, **kwargs):
+        _count_statement(None)
+        return self._cursor.copy_expert(*args, **kwargs)
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._cursor.__exit__(*exc)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class _CountingConnection:
+    """psycopg2 connection proxy handing out counting cursors"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return _CountingCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+def _count_statement(_):
+    with _statements_lock:
+        _statements['count'] += 1
+
+def run_participant(number, timeout):
+    """Simulate one participant; return timings and statement counts"""
+    from streamlit.testing.v1 import AppTest
+    from dataset_index import load_dataset_index
+
+    rng = random.Random(number)
+    result = {'reruns': [], 'submit': None, 'statistics': None, 'statements': 0, 'error': None}
+    try:
+        at = AppTest.from_file(os.path.join(ROOT, 'main.py'), default_timeout=timeout)
+        start = time.perf_counter()
+        at.run()
+        result['reruns'].append(time.perf_counter() - start)
+
+        at.text_input(key='participant_name').input(f"Peserta {number}")
+        at.text_input(key='participant_email').input(f"bench-{number}-{time.time_ns()}@example.com")
+
+        for key in load_dataset_index().rating_keys:
+            at.radio(key=key).set_value(rng.randint(1, 5))
+            start = time.perf_counter()
+            at.run()
+            result['reruns'].append(time.perf_counter() - start)
+
+        # Only meaningful when this participant runs alone (calibration run)
+        before = _statements['count']
+        at.button[-1].click()
+        start = time.perf_counter()
+        at.run()
+        result['submit'] = time.perf_counter() - start
+        result['statements'] = _statements['count'] - before
+        if at.exception or not at.success:
+            raise Exception(f"submit failed: {[e.value for e in at.exception] or [e.value for e in at.error]}")
+
+        stats = AppTest.from_file(os.path.join(ROOT, 'pages', '1_Statistik.py'), default_timeout=timeout)
+        start = time.perf_counter()
+        stats.run()
+        result['statistics'] = time.perf_counter() - start
+        if stats.exception:
+            raise Exception(f"statistics page failed: {[e.value for e in stats.exception]}")
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def compare(report, baseline_path):
+    """Print p95 changes against a previous report"""
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({baseline.get('git_revision')}):")
+    for metric in ('rerun', 'submit', 'statistics'):
+        old = baseline['results'][metric]['p95_ms']
+        new = report['results'][metric]['p95_ms']
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"  {metric:<11} p95 {old:9.2f} ms -> {new:9.2f} ms ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-participant load test")
+    parser.add_argument('--participants', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--backend', choices=['sqlite', 'postgres'], default='sqlite')
+    parser.add_argument('--timeout', type=float, default=60, help="AppTest timeout per run (seconds)")
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results', 'latest.json'))
+    parser.add_argument('--baseline', help="previous report to compare against")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    os.environ['STORAGE_BACKEND'] = args.backend
+    os.environ['SUBMISSION_MODE'] = 'sync'
+    os.environ['FORM_PAGE_SIZE'] = '0'
+    if args.backend == 'sqlite':
+        tmp = tempfile.mkdtemp(prefix='mos-bench-')
+        os.environ['SQLITE_PATH'] = os.path.join(tmp, 'bench.sqlite3')
+    install_statement_counter(args.backend)
+
+    started = time.time()
+    # One fresh process per participant: AppTest replaces __main__ in the
+    # process it runs in
+    with ProcessPoolExecutor(max_workers=args.concurrency, max_tasks_per_child=1) as executor:
+        results = list(executor.map(
+            run_participant, range(args.participants), [args.timeout] * args.participants
+        ))
+    elapsed = time.time() - started
+
+    # A lone participant in this process, so statements per submit are not
+    # mixed up with other participants' queries
+    calibration = run_participant(-1, args.timeout)
+
+    errors = [r['error'] for r in [calibration] + results if r['error']]
+    completed = [r for r in results if not r['error']]
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'config': {
+            'participants': args.participants,
+            'concurrency': args.concurrency,
+            'backend': args.backend,
+        },
+        'results': {
+            'rerun': summarize([t for r in results for t in r['reruns']]),
+            'submit': summarize([r['submit'] for r in completed]),
+            'statistics': summarize([r['statistics'] for r in completed]),
+            'db_statements_per_submit': None if calibration['error'] else calibration['statements'],
+            'peak_rss_mb': round(max(
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+            ) / 1024, 1),
+            'elapsed_s': round(elapsed, 2),
+            'submissions_per_s': round(len(completed) / elapsed, 2) if elapsed else 0,
+            'errors': len(errors),
+        },
+        'error_samples': errors[:5],
+    }
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report['results'], indent=2))
+    print(f"Report written to {args.output}")
+    if args.baseline:
+        compare(report, args.baseline)
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Build final_dataset.json from the audios/ tree.
+
+dataset_config.json describes each language in dataset_index.LANGUAGES:
+    "samples": ordered list of {"audio": ..., "text": ...} originals, or
+    "originals": a directory whose WAV files are used in sorted order, with
+                 the transcript read from a .txt file next to each WAV
+    "outputs":  dataset field -> path pattern of that model's output, e.g.
+                "./audios/finetuned_outputs_sunda/vits/sample_{index:02d}.wav"
+                ({index} is the sample position, {stem} the original's name)
+
+Every referenced WAV header is read in parallel to get duration, sample rate
+and channels, which also verifies the file exists and is readable. Results are
+cached by path, mtime and size in .dataset_build_cache.json, so reruns only
+read new or changed files. The dataset is written to final_dataset.json (only
+when it changed, so the dataset version stays stable) together with a
+final_dataset.meta.json sidecar holding the per-file metadata.
+
+Usage:
+    python build_dataset.py [--config dataset_config.json] [--workers N] [--check]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataset_index import DATASET_PATH, LANGUAGES, MODEL_REGISTRY, AUDIO_FIELDS
+
+CONFIG_PATH = 'dataset_config.json'
+CACHE_PATH = '.dataset_build_cache.json'
+META_SUFFIX = '.meta.json'
+
+def load_json(path, default=None):
+    """Read a JSON file, returning default when it does not exist"""
+    if default is not None and not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def write_json(path, data):
+    """Atomically write data as indented JSON"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    os.replace(tmp_path, path)
+
+def discover_originals(directory):
+    """Originals of a directory by convention: sorted WAVs with .txt transcripts"""
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() != '.wav':
+            continue
+        transcript = os.path.join(directory, stem + '.txt')
+        text = None
+        if os.path.exists(transcript):
+            with open(transcript, 'r', encoding='utf-8') as f:
+                text = f.read().strip()
+        samples.append({'audio': './' + os.path.join(os.path.normpath(directory), name), 'text': text})
+    return samples
+
+def build_entries(config):
+    """Pair every original with its model outputs; return dataset entries"""
+    output_fields = [field for field in AUDIO_FIELDS if field != 'original_audio']
+    entries = []
+    for language in LANGUAGES:
+        spec = config.get(language.sample_type)
+        if spec is None:
+            continue
+        samples = spec.get('samples')
+        if samples is None:
+            samples = discover_originals(spec['originals'])
+
+        missing_patterns = [
+            model.field for model in MODEL_REGISTRY[language.sample_type]
+            if model.field not in spec['outputs']
+        ]
+        if missing_patterns:
+            raise Exception(f"No output pattern for {language.sample_type}: {', '.join(missing_patterns)}")
+
+        for index, sample in enumerate(samples):
+            stem = os.path.splitext(os.path.basename(sample['audio']))[0]
+            entry = {
+                'type': language.sample_type,
+                'original_audio': sample['audio'],
+                'original_text': sample['text'],
+            }
+            for field in output_fields:
+                pattern = spec['outputs'].get(field)
+                entry[field] = pattern.format(index=index, stem=stem) if pattern else None
+            entries.append(entry)
+    return entries
+
+def read_wav_header(path):
+    """Return duration, sample rate and channels from a WAV header"""
+    with wave.open(path, 'rb') as w:
+        rate = w.getframerate()
+        return {
+            'duration': w.getnframes() / rate if rate else 0.0,
+            'sample_rate': rate,
+            'channels': w.getnchannels(),
+        }
+
+def probe(path, cached):
+    """Return (path, metadata, error), reusing cached when mtime and size match"""
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        return path, None, f"missing ({e.strerror})"
+    if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+        return path, cached, None
+    try:
+        meta = read_wav_header(path)
+    except Exception as e:
+        return path, None, f"unreadable ({e})"
+    meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    return path, meta, None
+
+def probe_all(paths, cache, workers):
+    """Probe paths in parallel; return (metadata by path, errors, files read)"""
+    metadata, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda p: probe(p, cache.get(p)), paths)
+        for path, meta, error in results:
+            if error:
+                errors[path] = error
+            else:
+                metadata[path] = meta
+    read = sum(1 for path, meta in metadata.items() if meta is not cache.get(path))
+    return metadata, errors, read
+
+def build(config_path=CONFIG_PATH, output=DATASET_PATH, workers=None, check=False):
+    """Build the dataset and sidecar; return a process exit code"""
+    start = time.perf_counter()
+    entries = build_entries(load_json(config_path))
+    paths = list(dict.fromkeys(
+        entry[field] for entry in entries for field in AUDIO_FIELDS if entry.get(field)
+    ))
+
+    cache = load_json(CACHE_PATH, {})
+    metadata, errors, read = probe_all(paths, cache, workers or min(32, (os.cpu_count() or 1) * 4))
+    for entry in entries:
+        if not entry['original_text']:
+            errors[entry['original_audio']] = "no transcript"
+
+    if errors:
+        for path, error in errors.items():
+            print(f"❌ {path}: {error}")
+        print(f"{len(errors)} problem(s) found, {output} not written")
+        return 1
+
+    write_json(CACHE_PATH, metadata)
+    print(f"Verified {len(paths)} files ({read} read, {len(paths) - read} cached)")
+    if check:
+        return 0
+
+    if entries != load_json(output, []):
+        write_json(output, entries)
+        print(f"Wrote {output} ({len(entries)} samples)")
+    else:
+        print(f"{output} is up to date ({len(entries)} samples)")
+
+    files = {
+        path: {key: metadata[path][key] for key in ('duration', 'sample_rate', 'channels', 'size')}
+        for path in paths
+    }
+    write_json(os.path.splitext(output)[0] + META_SUFFIX, {
+        'samples': {
+            language.sample_type: sum(1 for entry in entries if entry['type'] == language.sample_type)
+            for language in LANGUAGES
+        },
+        'total_duration': round(sum(meta['duration'] for meta in files.values()), 3),
+        'files': files,
+    })
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Build final_dataset.json from the audios/ tree")
+    parser.add_argument('--config', default=CONFIG_PATH)
+    parser.add_argument('--output', default=DATASET_PATH)
+    parser.add_argument('--workers', type=int, help="parallel header readers")
+    parser.add_argument('--check', action='store_true', help="verify files only, write nothing but the cache")
+    args = parser.parse_args()
+    try:
+        return build(args.config, args.output, args.workers, args.check)
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
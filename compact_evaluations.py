@@ -0,0 +1,46 @@
+"""
+Convert stored evaluations to the compact payload format.
+
+Legacy payloads repeat model_name, audio_path and original_text for every
+rating. This rewrites each one as {"v": 2, "manifest": <version>, "r": [...]}
+against the manifest of the current dataset (stored in dataset_manifests on
+first use), in batches of COMPACT_BATCH_SIZE evaluations, each committed on
+its own, so the script can be interrupted and rerun. Payloads that do not
+match the current dataset are left as they are; both formats are read
+everywhere, and the ratings (and therefore the rollups) do not change.
+
+Works with either STORAGE_BACKEND.
+
+Usage:
+    python compact_evaluations.py [--batch-size 1000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from dataset_index import load_dataset_index
+from storage import compact_evaluations, init_database
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite legacy evaluation payloads in the compact format")
+    parser.add_argument('--batch-size', type=int, help="evaluations per batch (default COMPACT_BATCH_SIZE or 1000)")
+    args = parser.parse_args()
+    batch_size = args.batch_size or int(os.getenv('COMPACT_BATCH_SIZE', '1000'))
+
+    try:
+        init_database()
+        version = load_dataset_index().version
+        start = time.perf_counter()
+        converted, skipped = compact_evaluations(version, batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"✅ Compacted {converted} evaluations against dataset {version} in {elapsed:.1f}s")
+        if skipped:
+            print(f"ℹ️ {skipped} evaluations do not match the current dataset and were kept as they are")
+    except Exception as e:
+        print(f"❌ Compaction failed: {str(e)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
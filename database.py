@@ -1,225 +1,1208 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import pool as pg_pool
+from psycopg2.extras import RealDictCursor, execute_values
 import os
 import json
-from dotenv import load_dotenv
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from dataset_index import EVALUATION_FORMAT, block_pairs, compact_evaluation, is_compact, load_manifest, pick_samples
+from metrics import register_collector, timer
+from startup import load_env
 
-load_dotenv()
+# NOTIFY channel fired whenever evaluations or rollups change
+EVALUATIONS_CHANNEL = 'evaluations_changed'
+
+# Process-wide connection pool, shared by every Streamlit session
+_pool = None
+_pool_lock = threading.Lock()
+_pool_slots = None
+_last_used = {}
+_pool_stats = {
+    'checkouts': 0,
+    'waits': 0,
+    'wait_time_total': 0.0,
+    'wait_time_max': 0.0,
+    'timeouts': 0,
+    'health_check_failures': 0,
+    'in_use': 0,
+}
+
+def _connection_params():
+    """Connection parameters read from the environment (and .env)"""
+    load_env()
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': os.getenv('DB_PORT', '5432'),
+        'database': os.getenv('DB_NAME', 'mos_evaluation'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', ''),
+        'sslmode': os.getenv('DB_SSLMODE', 'prefer'),
+    }
 
 def get_db_connection():
-    """Create and return a database connection"""
+    """Create and return a standalone (unpooled) database connection"""
     try:
-        conn = psycopg2.connect(
-            host=os.getenv('DB_HOST', 'localhost'),
-            port=os.getenv('DB_PORT', '5432'),
-            database=os.getenv('DB_NAME', 'mos_evaluation'),
-            user=os.getenv('DB_USER', 'postgres'),
-            password=os.getenv('DB_PASSWORD', ''),
-            sslmode=os.getenv('DB_SSLMODE', 'prefer')
-        )
+        with timer('db.connect'):
+            conn = psycopg2.connect(**_connection_params())
         return conn
     except Exception as e:
         raise Exception(f"Database connection error: {str(e)}")
 
+def get_connection_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool, _pool_slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                load_env()
+                min_size = int(os.getenv('DB_POOL_MIN', '1'))
+                max_size = int(os.getenv('DB_POOL_MAX', '10'))
+                try:
+                    with timer('db.pool_create'):
+                        _pool = pg_pool.ThreadedConnectionPool(
+                            min_size, max_size, **_connection_params()
+                        )
+                except Exception as e:
+                    raise Exception(f"Database connection error: {str(e)}")
+                # ThreadedConnectionPool raises instead of waiting when it is
+                # exhausted, so callers queue on this semaphore first
+                _pool_slots = threading.BoundedSemaphore(max_size)
+    return _pool
+
+def _is_healthy(conn):
+    """Check a pooled connection before handing it out"""
+    if conn.closed:
+        return False
+    interval = float(os.getenv('DB_POOL_HEALTHCHECK_SECONDS', '30'))
+    if time.monotonic() - _last_used.get(id(conn), 0) < interval:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except Exception:
+        return False
+
+@contextmanager
+def db_connection():
+    """Borrow a connection from the pool and return it when done"""
+    pool = get_connection_pool()
+    timeout = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+
+    wait_start = time.monotonic()
+    acquired = _pool_slots.acquire(blocking=False)
+    if not acquired:
+        acquired = _pool_slots.acquire(timeout=timeout)
+        waited = time.monotonic() - wait_start
+        with _pool_lock:
+            _pool_stats['waits'] += 1
+            _pool_stats['wait_time_total'] += waited
+            _pool_stats['wait_time_max'] = max(_pool_stats['wait_time_max'], waited)
+            if not acquired:
+                _pool_stats['timeouts'] += 1
+        if not acquired:
+            raise Exception(f"Database connection error: no pooled connection available after {timeout}s")
+
+    conn = None
+    try:
+        # Includes opening a new connection when the pool has no idle one
+        with timer('db.checkout'):
+            conn = pool.getconn()
+        if not _is_healthy(conn):
+            with _pool_lock:
+                _pool_stats['health_check_failures'] += 1
+            _last_used.pop(id(conn), None)
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+    except Exception as e:
+        if conn is not None:
+            pool.putconn(conn, close=True)
+        _pool_slots.release()
+        raise Exception(f"Database connection error: {str(e)}")
+
+    with _pool_lock:
+        _pool_stats['checkouts'] += 1
+        _pool_stats['in_use'] += 1
+    try:
+        yield conn
+    finally:
+        broken = bool(conn.closed)
+        if not broken and conn.status != psycopg2.extensions.STATUS_READY:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+        if broken:
+            _last_used.pop(id(conn), None)
+        else:
+            _last_used[id(conn)] = time.monotonic()
+        pool.putconn(conn, close=broken)
+        with _pool_lock:
+            _pool_stats['in_use'] -= 1
+        _pool_slots.release()
+
+def get_pool_stats():
+    """Return a snapshot of the connection pool wait metrics"""
+    with _pool_lock:
+        stats = dict(_pool_stats)
+    stats['max_size'] = int(os.getenv('DB_POOL_MAX', '10'))
+    stats['min_size'] = int(os.getenv('DB_POOL_MIN', '1'))
+    stats['average_wait'] = stats['wait_time_total'] / stats['waits'] if stats['waits'] else 0.0
+    return stats
+
+register_collector('db_pool', get_pool_stats)
+
+def close_connection_pool():
+    """Close every pooled connection"""
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+        _pool = None
+        _pool_slots = None
+        _last_used.clear()
+
+# Folds the ratings of newly inserted evaluations (legacy or compact payloads,
+# see dataset_index.py) into rating_rollups and notifies EVALUATIONS_CHANNEL
+# listeners. Used after a CTE named
+# new_evaluation returning participant_id and evaluation_data. The final
+# SELECT must reference "notified" for the notification to be sent.
+_ROLLUP_UPSERT_CTE = f"""
+    rollup AS (
+        INSERT INTO rating_rollups AS r (
+            model_id, sample_type, sample_index, model_name,
+            rating_count, rating_sum, rating_sum_sq, rating_min, rating_max
+        )
+        SELECT
+            model_id, sample_type, sample_index, MAX(model_name),
+            COUNT(*), SUM(rating), SUM(rating * rating), MIN(rating), MAX(rating)
+        FROM (
+            SELECT
+                rating->>'model_id' AS model_id,
+                rating->>'sample_type' AS sample_type,
+                (rating->>'sample_index')::integer AS sample_index,
+                rating->>'model_name' AS model_name,
+                (rating->>'rating')::integer AS rating
+            FROM new_evaluation,
+                 jsonb_array_elements(new_evaluation.evaluation_data->'ratings') AS rating
+            UNION ALL
+            SELECT m.model_id, m.sample_type, m.sample_index, m.model_name, v.rating::integer
+            FROM new_evaluation
+            CROSS JOIN LATERAL jsonb_array_elements_text(new_evaluation.evaluation_data->'r')
+                 WITH ORDINALITY AS v(rating, slot)
+            JOIN dataset_manifests m
+              ON m.version = new_evaluation.evaluation_data->>'manifest' AND m.slot = v.slot
+            WHERE v.rating <> '0'
+        ) AS rating
+        GROUP BY model_id, sample_type, sample_index
+        ON CONFLICT (model_id, sample_type, sample_index) DO UPDATE SET
+            model_name = EXCLUDED.model_name,
+            rating_count = r.rating_count + EXCLUDED.rating_count,
+            rating_sum = r.rating_sum + EXCLUDED.rating_sum,
+            rating_sum_sq = r.rating_sum_sq + EXCLUDED.rating_sum_sq,
+            rating_min = LEAST(r.rating_min, EXCLUDED.rating_min),
+            rating_max = GREATEST(r.rating_max, EXCLUDED.rating_max)
+    ),
+    notified AS (
+        SELECT pg_notify('{EVALUATIONS_CHANNEL}', participant_id::text)
+        FROM new_evaluation
+    )
+"""
+
+# Versioned schema changes, applied in order by init_database(). Each one runs
+# once per database and is recorded in schema_migrations. Statements use
+# IF NOT EXISTS so databases created before versioning upgrade cleanly.
+SCHEMA_MIGRATIONS = (
+    (1, 'create participants and evaluations', (
+        """
+        CREATE TABLE IF NOT EXISTS participants (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            email VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS evaluations (
+            id SERIAL PRIMARY KEY,
+            participant_id INTEGER REFERENCES participants(id),
+            evaluation_data JSONB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    )),
+    # Idempotency key for submissions flushed from the write-behind queue
+    (2, 'add participants.submission_key', (
+        """
+        ALTER TABLE participants
+        ADD COLUMN IF NOT EXISTS submission_key VARCHAR(64) UNIQUE
+        """,
+    )),
+    # Per-model/per-sample rating rollups
+    (3, 'create rating_rollups', (
+        """
+        CREATE TABLE IF NOT EXISTS rating_rollups (
+            model_id VARCHAR(10) NOT NULL,
+            sample_type VARCHAR(50) NOT NULL,
+            sample_index INTEGER NOT NULL,
+            model_name VARCHAR(255),
+            rating_count BIGINT NOT NULL DEFAULT 0,
+            rating_sum BIGINT NOT NULL DEFAULT 0,
+            rating_sum_sq BIGINT NOT NULL DEFAULT 0,
+            rating_min INTEGER,
+            rating_max INTEGER,
+            PRIMARY KEY (model_id, sample_type, sample_index)
+        )
+        """,
+    )),
+    # In-progress ratings, autosaved per browser session token
+    (4, 'create drafts', (
+        """
+        CREATE TABLE IF NOT EXISTS drafts (
+            token VARCHAR(64) PRIMARY KEY,
+            name VARCHAR(255),
+            email VARCHAR(255),
+            ratings JSONB NOT NULL DEFAULT '{}'::jsonb,
+            participant_id INTEGER REFERENCES participants(id),
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            submitted_at TIMESTAMP
+        )
+        """,
+    )),
+    # Duplicate-email check, newest-first listings and participant joins
+    (5, 'add lookup and ordering indexes', (
+        "CREATE INDEX IF NOT EXISTS idx_participants_email ON participants(email)",
+        "CREATE INDEX IF NOT EXISTS idx_participants_created_at_id ON participants(created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_evaluations_participant ON evaluations(participant_id)",
+        "CREATE INDEX IF NOT EXISTS idx_evaluations_created_at_id ON evaluations(created_at, id)",
+    )),
+    # Containment filters on the JSON payload, e.g.
+    # evaluation_data @> '{"ratings": [{"model_id": "A", "rating": 1}]}'
+    (6, 'add evaluation_data GIN index', (
+        """
+        CREATE INDEX IF NOT EXISTS idx_evaluations_data
+        ON evaluations USING GIN (evaluation_data jsonb_path_ops)
+        """,
+    )),
+    # Balanced sample assignment (SAMPLES_PER_PARTICIPANT)
+    (7, 'create sample assignment tables', (
+        """
+        CREATE TABLE IF NOT EXISTS assignment_counts (
+            sample_type VARCHAR(50) NOT NULL,
+            sample_index INTEGER NOT NULL,
+            assigned_count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (sample_type, sample_index)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS sample_assignments (
+            token VARCHAR(64) PRIMARY KEY,
+            samples JSONB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    )),
+    # Compact evaluation payloads: one manifest row per rating slot and dataset
+    # version, and a view expanding both payload formats into rating rows
+    (8, 'create dataset_manifests and evaluation_ratings', (
+        """
+        CREATE TABLE IF NOT EXISTS dataset_manifests (
+            version VARCHAR(12) NOT NULL,
+            slot INTEGER NOT NULL,
+            rating_key VARCHAR(100) NOT NULL,
+            sample_type VARCHAR(50) NOT NULL,
+            sample_index INTEGER NOT NULL,
+            model_id VARCHAR(10) NOT NULL,
+            model_name VARCHAR(255),
+            audio_path TEXT,
+            original_text TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (version, slot)
+        )
+        """,
+        """
+        CREATE OR REPLACE VIEW evaluation_ratings AS
+        SELECT
+            e.id AS evaluation_id,
+            e.participant_id,
+            e.created_at,
+            rating->>'sample_type' AS sample_type,
+            (rating->>'sample_index')::integer AS sample_index,
+            rating->>'model_id' AS model_id,
+            rating->>'model_name' AS model_name,
+            (rating->>'rating')::integer AS rating,
+            rating->>'audio_path' AS audio_path,
+            rating->>'original_text' AS original_text
+        FROM evaluations e,
+             jsonb_array_elements(e.evaluation_data->'ratings') AS rating
+        UNION ALL
+        SELECT
+            e.id,
+            e.participant_id,
+            e.created_at,
+            m.sample_type,
+            m.sample_index,
+            m.model_id,
+            m.model_name,
+            v.rating::integer,
+            m.audio_path,
+            m.original_text
+        FROM evaluations e
+        CROSS JOIN LATERAL jsonb_array_elements_text(e.evaluation_data->'r')
+             WITH ORDINALITY AS v(rating, slot)
+        JOIN dataset_manifests m
+          ON m.version = e.evaluation_data->>'manifest' AND m.slot = v.slot
+        WHERE v.rating <> '0'
+        """,
+    )),
+    # Position of each rating within its payload, so expanded payloads keep
+    # their order (new view columns can only be appended)
+    (9, 'add position to evaluation_ratings', (
+        """
+        CREATE OR REPLACE VIEW evaluation_ratings AS
+        SELECT
+            e.id AS evaluation_id,
+            e.participant_id,
+            e.created_at,
+            rating->>'sample_type' AS sample_type,
+            (rating->>'sample_index')::integer AS sample_index,
+            rating->>'model_id' AS model_id,
+            rating->>'model_name' AS model_name,
+            (rating->>'rating')::integer AS rating,
+            rating->>'audio_path' AS audio_path,
+            rating->>'original_text' AS original_text,
+            position
+        FROM evaluations e,
+             jsonb_array_elements(e.evaluation_data->'ratings') WITH ORDINALITY AS r(rating, position)
+        UNION ALL
+        SELECT
+            e.id,
+            e.participant_id,
+            e.created_at,
+            m.sample_type,
+            m.sample_index,
+            m.model_id,
+            m.model_name,
+            v.rating::integer,
+            m.audio_path,
+            m.original_text,
+            v.slot
+        FROM evaluations e
+        CROSS JOIN LATERAL jsonb_array_elements_text(e.evaluation_data->'r')
+             WITH ORDINALITY AS v(rating, slot)
+        JOIN dataset_manifests m
+          ON m.version = e.evaluation_data->>'manifest' AND m.slot = v.slot
+        WHERE v.rating <> '0'
+        """,
+    )),
+    # Pair balance of the assigned blocks: how often two samples shared a session
+    (10, 'create assignment_pairs', (
+        """
+        CREATE TABLE IF NOT EXISTS assignment_pairs (
+            first_type VARCHAR(50) NOT NULL,
+            first_index INTEGER NOT NULL,
+            second_type VARCHAR(50) NOT NULL,
+            second_index INTEGER NOT NULL,
+            pair_count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (first_type, first_index, second_type, second_index)
+        )
+        """,
+    )),
+)
+
+# pg_advisory_xact_lock keys that serialize schema upgrades and assignments
+SCHEMA_LOCK_ID = 7245001
+ASSIGNMENT_LOCK_ID = 7245002
+
 def init_database():
-    """Initialize database tables"""
-    conn = get_db_connection()
-    cur = conn.cursor()
+    """Create or upgrade the schema by applying pending SCHEMA_MIGRATIONS"""
+    with db_connection() as conn:
+        cur = conn.cursor()
     
-    try:
-        # Create participants table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS participants (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                email VARCHAR(255) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        try:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_ID,))
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cur.fetchall()}
+        
+            for version, name, statements in SCHEMA_MIGRATIONS:
+                if version in applied:
+                    continue
+                for statement in statements:
+                    cur.execute(statement)
+                cur.execute("""
+                    INSERT INTO schema_migrations (version, name) VALUES (%s, %s)
+                """, (version, name))
+                print(f"Applied schema migration {version}: {name}")
         
-        # Create evaluations table
+            conn.commit()
+            print("Database tables created successfully!")
+        
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error initializing database: {str(e)}")
+        finally:
+            cur.close()
+
+# Dataset versions whose manifest is known to be in dataset_manifests
+_stored_manifests = set()
+
+def _manifest_versions(payloads):
+    """Dataset versions referenced by compact payloads"""
+    return {data['manifest'] for data in payloads if is_compact(data)}
+
+def _store_manifests(cur, versions):
+    """Insert missing manifests in the caller's transaction.
+
+    Returns the versions to add to _stored_manifests once committed.
+    """
+    versions = set(versions) - _stored_manifests
+    for version in versions:
+        cur.execute("SELECT 1 FROM dataset_manifests WHERE version = %s LIMIT 1", (version,))
+        if cur.fetchone() is not None:
+            continue
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS evaluations (
-                id SERIAL PRIMARY KEY,
-                participant_id INTEGER REFERENCES participants(id),
-                evaluation_data JSONB NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            INSERT INTO dataset_manifests (
+                version, slot, rating_key, sample_type, sample_index,
+                model_id, model_name, audio_path, original_text
             )
-        """)
-        conn.commit()
-        print("Database tables created successfully!")
-        
-    except Exception as e:
-        conn.rollback()
-        raise Exception(f"Error initializing database: {str(e)}")
-    finally:
-        cur.close()
-        conn.close()
+            SELECT %s, m.*
+            FROM jsonb_to_recordset(%s::jsonb) AS m(
+                slot integer, rating_key text, sample_type text, sample_index integer,
+                model_id text, model_name text, audio_path text, original_text text
+            )
+            ON CONFLICT (version, slot) DO NOTHING
+        """, (version, json.dumps([
+            dict(slot, slot=position) for position, slot in enumerate(load_manifest(version), 1)
+        ])))
+        print(f"Stored dataset manifest {version}")
+    return versions
+
+def store_manifest(version):
+    """Store the manifest of a dataset version if it is not stored yet"""
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            stored = _store_manifests(cur, [version])
+            conn.commit()
+            _stored_manifests.update(stored)
+
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error storing dataset manifest: {str(e)}")
+        finally:
+            cur.close()
 
 def save_participant(name, email):
     """Save participant and return participant ID"""
-    conn = get_db_connection()
-    cur = conn.cursor()
+    with db_connection() as conn:
+        cur = conn.cursor()
     
-    try:
-        cur.execute("""
-            INSERT INTO participants (name, email)
-            VALUES (%s, %s)
-            RETURNING id
-        """, (name, email))
+        try:
+            cur.execute("""
+                INSERT INTO participants (name, email)
+                VALUES (%s, %s)
+                RETURNING id
+            """, (name, email))
         
-        participant_id = cur.fetchone()[0]
-        conn.commit()
-        return participant_id
+            participant_id = cur.fetchone()[0]
+            conn.commit()
+            return participant_id
         
-    except Exception as e:
-        conn.rollback()
-        raise Exception(f"Error saving participant: {str(e)}")
-    finally:
-        cur.close()
-        conn.close()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error saving participant: {str(e)}")
+        finally:
+            cur.close()
 
 def save_evaluation(participant_id, evaluation_data):
     """Save evaluation data as JSON"""
-    conn = get_db_connection()
-    cur = conn.cursor()
+    with db_connection() as conn:
+        cur = conn.cursor()
     
-    try:
-        cur.execute("""
-            INSERT INTO evaluations 
-            (participant_id, evaluation_data)
-            VALUES (%s, %s)
-        """, (participant_id, json.dumps(evaluation_data)))
+        try:
+            stored = _store_manifests(cur, _manifest_versions([evaluation_data]))
+            cur.execute("""
+                WITH new_evaluation AS (
+                    INSERT INTO evaluations 
+                    (participant_id, evaluation_data)
+                    VALUES (%(participant_id)s, %(evaluation_data)s)
+                    RETURNING participant_id, evaluation_data
+                ),
+            """ + _ROLLUP_UPSERT_CTE + """
+                SELECT COUNT(*) FROM notified
+            """, {
+                'participant_id': participant_id,
+                'evaluation_data': json.dumps(evaluation_data),
+            })
         
-        conn.commit()
+            conn.commit()
+            _stored_manifests.update(stored)
         
-    except Exception as e:
-        conn.rollback()
-        raise Exception(f"Error saving evaluation: {str(e)}")
-    finally:
-        cur.close()
-        conn.close()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error saving evaluation: {str(e)}")
+        finally:
+            cur.close()
+
+def submit_evaluation(name, email, evaluation_data, allow_duplicate=False):
+    """Save participant and evaluation atomically in a single round trip.
+
+    The rating rollups are updated in the same statement.
+
+    Returns a tuple (participant_id, duplicate). When the email already
+    exists and allow_duplicate is False nothing is written and
+    participant_id is None.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            stored = _store_manifests(cur, _manifest_versions([evaluation_data]))
+            cur.execute("""
+                WITH existing AS (
+                    SELECT id FROM participants WHERE email = %(email)s LIMIT 1
+                ),
+                new_participant AS (
+                    INSERT INTO participants (name, email)
+                    SELECT %(name)s, %(email)s
+                    WHERE %(allow_duplicate)s OR NOT EXISTS (SELECT 1 FROM existing)
+                    RETURNING id
+                ),
+                new_evaluation AS (
+                    INSERT INTO evaluations (participant_id, evaluation_data)
+                    SELECT id, %(evaluation_data)s FROM new_participant
+                    RETURNING participant_id, evaluation_data
+                ),
+            """ + _ROLLUP_UPSERT_CTE + """
+                SELECT
+                    (SELECT participant_id FROM new_evaluation) AS participant_id,
+                    EXISTS (SELECT 1 FROM existing) AS duplicate,
+                    (SELECT COUNT(*) FROM notified) AS notified
+            """, {
+                'name': name,
+                'email': email,
+                'allow_duplicate': allow_duplicate,
+                'evaluation_data': json.dumps(evaluation_data),
+            })
+
+            participant_id, duplicate, _ = cur.fetchone()
+            conn.commit()
+            _stored_manifests.update(stored)
+            return participant_id, duplicate
+
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error saving evaluation: {str(e)}")
+        finally:
+            cur.close()
+
+_DRAFT_UPSERT = """
+    INSERT INTO drafts AS d (token, name, email, ratings)
+    VALUES (%(token)s, %(name)s, %(email)s, %(ratings)s)
+    ON CONFLICT (token) DO UPDATE SET
+        name = EXCLUDED.name,
+        email = EXCLUDED.email,
+        ratings = d.ratings || EXCLUDED.ratings,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE d.submitted_at IS NULL
+"""
+
+def save_draft(token, name, email, changed_ratings):
+    """Merge changed ratings (rating key -> rating) into a draft"""
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            cur.execute(_DRAFT_UPSERT, {
+                'token': token,
+                'name': name,
+                'email': email,
+                'ratings': json.dumps(changed_ratings),
+            })
+            conn.commit()
+
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error saving draft: {str(e)}")
+        finally:
+            cur.close()
+
+def get_draft(token):
+    """Return a draft as a dict (name, email, ratings, submitted) or None"""
+    with db_connection() as conn:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+
+        try:
+            cur.execute("""
+                SELECT name, email, ratings, submitted_at IS NOT NULL AS submitted
+                FROM drafts
+                WHERE token = %s
+            """, (token,))
+
+            return cur.fetchone()
+
+        except Exception as e:
+            raise Exception(f"Error retrieving draft: {str(e)}")
+        finally:
+            cur.close()
+
+def promote_draft(token, name, email, changed_ratings, manifest_version, allow_duplicate=False):
+    """Submit a draft in place, after merging the last unsaved ratings.
+
+    The evaluation is built from the stored draft, so only changed_ratings
+    are sent; it is stored compactly against the manifest of
+    manifest_version. Returns (participant_id, duplicate) like
+    submit_evaluation; a draft that was already submitted returns its
+    participant id again.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            stored = _store_manifests(cur, [manifest_version])
+            cur.execute(_DRAFT_UPSERT, {
+                'token': token,
+                'name': name,
+                'email': email,
+                'ratings': json.dumps(changed_ratings),
+            })
+            cur.execute("""
+                WITH draft AS (
+                    SELECT token, ratings FROM drafts
+                    WHERE token = %(token)s AND submitted_at IS NULL
+                    FOR UPDATE
+                ),
+                existing AS (
+                    SELECT id FROM participants WHERE email = %(email)s LIMIT 1
+                ),
+                new_participant AS (
+                    INSERT INTO participants (name, email)
+                    SELECT %(name)s, %(email)s FROM draft
+                    WHERE %(allow_duplicate)s OR NOT EXISTS (SELECT 1 FROM existing)
+                    RETURNING id
+                ),
+                new_evaluation AS (
+                    INSERT INTO evaluations (participant_id, evaluation_data)
+                    SELECT p.id, jsonb_build_object(
+                        'v', %(format)s,
+                        'manifest', %(manifest)s,
+                        'r', (
+                            -- Drafts saved before compact payloads hold full entries
+                            SELECT jsonb_agg(COALESCE(
+                                (COALESCE(draft.ratings->m.rating_key->'rating', draft.ratings->m.rating_key))::integer, 0
+                            ) ORDER BY m.slot)
+                            FROM dataset_manifests m
+                            WHERE m.version = %(manifest)s
+                        )
+                    )
+                    FROM new_participant p, draft
+                    RETURNING participant_id, evaluation_data
+                ),
+                submitted AS (
+                    UPDATE drafts SET
+                        participant_id = (SELECT participant_id FROM new_evaluation),
+                        submitted_at = CURRENT_TIMESTAMP
+                    WHERE token = %(token)s AND EXISTS (SELECT 1 FROM new_evaluation)
+                ),
+            """ + _ROLLUP_UPSERT_CTE + """
+                SELECT
+                    COALESCE(
+                        (SELECT participant_id FROM new_evaluation),
+                        (SELECT participant_id FROM drafts WHERE token = %(token)s AND submitted_at IS NOT NULL)
+                    ) AS participant_id,
+                    EXISTS (SELECT 1 FROM draft) AND EXISTS (SELECT 1 FROM existing) AS duplicate,
+                    (SELECT COUNT(*) FROM notified) AS notified
+            """, {
+                'token': token,
+                'name': name,
+                'email': email,
+                'allow_duplicate': allow_duplicate,
+                'format': EVALUATION_FORMAT,
+                'manifest': manifest_version,
+            })
+
+            participant_id, duplicate, _ = cur.fetchone()
+            conn.commit()
+            _stored_manifests.update(stored)
+            return participant_id, duplicate
+
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error submitting draft: {str(e)}")
+        finally:
+            cur.close()
+
+def submit_evaluations_batch(submissions):
+    """Write queued submissions with one multi-row statement.
+
+    Each submission is a dict with submission_key, name, email and
+    evaluation_data. Keys that were already written are skipped, so a batch
+    can safely be retried. Returns the number of submissions inserted.
+    """
+    if not submissions:
+        return 0
+
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            stored = _store_manifests(cur, _manifest_versions(
+                submission['evaluation_data'] for submission in submissions
+            ))
+            cur.execute("""
+                WITH batch AS (
+                    SELECT * FROM jsonb_to_recordset(%(batch)s::jsonb) AS b(
+                        submission_key text, name text, email text, evaluation_data jsonb
+                    )
+                ),
+                new_participant AS (
+                    INSERT INTO participants (name, email, submission_key)
+                    SELECT name, email, submission_key FROM batch
+                    ON CONFLICT (submission_key) DO NOTHING
+                    RETURNING id, submission_key
+                ),
+                new_evaluation AS (
+                    INSERT INTO evaluations (participant_id, evaluation_data)
+                    SELECT p.id, b.evaluation_data
+                    FROM new_participant p
+                    JOIN batch b USING (submission_key)
+                    RETURNING participant_id, evaluation_data
+                ),
+            """ + _ROLLUP_UPSERT_CTE + """
+                SELECT
+                    (SELECT COUNT(*) FROM new_evaluation),
+                    (SELECT COUNT(*) FROM notified)
+            """, {'batch': json.dumps(submissions)})
+
+            inserted, _ = cur.fetchone()
+            conn.commit()
+            _stored_manifests.update(stored)
+            return inserted
+
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error saving evaluation batch: {str(e)}")
+        finally:
+            cur.close()
+
+def assign_samples(token, pool, count, quotas):
+    """Pick the least-covered samples of pool for one session token.
+
+    pool is a list of (sample_type, sample_index); count samples are picked,
+    at least quotas[sample_type] of each language. Samples are ordered by how
+    often they were assigned, then by their least-rated model, with ties
+    broken at random, and the block is built greedily from that order (see
+    dataset_index.pick_samples) so samples are also spread over as many
+    different partners as possible. Assignments are serialized by an
+    advisory lock, and a token that already has an assignment gets the same
+    one back.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (ASSIGNMENT_LOCK_ID,))
+            cur.execute("SELECT samples FROM sample_assignments WHERE token = %s", (token,))
+            existing = cur.fetchone()
+            if existing:
+                conn.commit()
+                return [tuple(sample) for sample in existing[0]]
+
+            cur.execute("""
+                SELECT p.sample_type, p.sample_index, COALESCE(a.assigned_count, 0)
+                FROM jsonb_to_recordset(%s::jsonb) AS p(sample_type text, sample_index integer)
+                LEFT JOIN assignment_counts a USING (sample_type, sample_index)
+                LEFT JOIN (
+                    SELECT sample_type, sample_index, MIN(rating_count) AS rated
+                    FROM rating_rollups
+                    GROUP BY sample_type, sample_index
+                ) r USING (sample_type, sample_index)
+                ORDER BY COALESCE(a.assigned_count, 0), COALESCE(r.rated, 0), random()
+            """, (json.dumps([
+                {'sample_type': sample_type, 'sample_index': sample_index}
+                for sample_type, sample_index in pool
+            ]),))
+
+            candidates = [
+                ((sample_type, sample_index), assigned)
+                for sample_type, sample_index, assigned in cur.fetchall()
+            ]
+            cur.execute("SELECT * FROM assignment_pairs")
+            pair_counts = {
+                ((first_type, first_index), (second_type, second_index)): pair_count
+                for first_type, first_index, second_type, second_index, pair_count in cur.fetchall()
+            }
+            samples = pick_samples(candidates, count, quotas, pair_counts)
+
+            cur.execute("""
+                INSERT INTO assignment_counts AS a (sample_type, sample_index, assigned_count)
+                SELECT sample_type, sample_index, 1
+                FROM jsonb_to_recordset(%s::jsonb) AS s(sample_type text, sample_index integer)
+                ON CONFLICT (sample_type, sample_index) DO UPDATE SET
+                    assigned_count = a.assigned_count + 1
+            """, (json.dumps([
+                {'sample_type': sample_type, 'sample_index': sample_index}
+                for sample_type, sample_index in samples
+            ]),))
+            cur.execute("""
+                INSERT INTO assignment_pairs AS p
+                    (first_type, first_index, second_type, second_index, pair_count)
+                SELECT first_type, first_index, second_type, second_index, 1
+                FROM jsonb_to_recordset(%s::jsonb) AS s(
+                    first_type text, first_index integer, second_type text, second_index integer
+                )
+                ON CONFLICT (first_type, first_index, second_type, second_index) DO UPDATE SET
+                    pair_count = p.pair_count + 1
+            """, (json.dumps([
+                {'first_type': first[0], 'first_index': first[1], 'second_type': second[0], 'second_index': second[1]}
+                for first, second in block_pairs(samples)
+            ]),))
+            cur.execute("""
+                INSERT INTO sample_assignments (token, samples) VALUES (%s, %s)
+            """, (token, json.dumps(samples)))
+            conn.commit()
+            return samples
+
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error assigning samples: {str(e)}")
+        finally:
+            cur.close()
 
 def get_all_evaluations():
-    """Retrieve all evaluations with participant information"""
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+    """Retrieve all evaluations with participant information.
+
+    evaluation_data is always returned with full rating entries, whatever
+    format it is stored in.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
     
-    try:
-        cur.execute("""
-            SELECT 
-                e.id,
-                p.name as participant_name,
-                p.email as participant_email,
-                e.evaluation_data,
-                e.created_at
-            FROM evaluations e
-            JOIN participants p ON e.participant_id = p.id
-            ORDER BY e.created_at DESC
-        """)
-        
-        return cur.fetchall()
+        try:
+            cur.execute("""
+                SELECT 
+                    e.id,
+                    p.name as participant_name,
+                    p.email as participant_email,
+                    jsonb_build_object('ratings', COALESCE((
+                        SELECT jsonb_agg(jsonb_build_object(
+                            'sample_type', r.sample_type,
+                            'sample_index', r.sample_index,
+                            'model_id', r.model_id,
+                            'model_name', r.model_name,
+                            'rating', r.rating,
+                            'audio_path', r.audio_path,
+                            'original_text', r.original_text
+                        ) ORDER BY r.position)
+                        FROM evaluation_ratings r
+                        WHERE r.evaluation_id = e.id
+                    ), '[]'::jsonb)) as evaluation_data,
+                    e.created_at
+                FROM evaluations e
+                JOIN participants p ON e.participant_id = p.id
+                ORDER BY e.created_at DESC, e.id DESC
+            """)
         
-    except Exception as e:
-        raise Exception(f"Error retrieving evaluations: {str(e)}")
-    finally:
-        cur.close()
-        conn.close()
+            return cur.fetchall()
+        
+        except Exception as e:
+            raise Exception(f"Error retrieving evaluations: {str(e)}")
+        finally:
+            cur.close()
+
+def get_rating_rows(after_evaluation_id=0, known_ids=()):
+    """Return one row per rating for evaluations with id > after_evaluation_id,
+    except the evaluations in known_ids"""
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            cur.execute("""
+                SELECT evaluation_id, participant_id, sample_type, sample_index, model_id, rating
+                FROM evaluation_ratings
+                WHERE evaluation_id > %s
+                  AND NOT evaluation_id = ANY(%s::integer[])
+                ORDER BY evaluation_id
+            """, (after_evaluation_id, list(known_ids)))
+
+            return cur.fetchall()
+
+        except Exception as e:
+            raise Exception(f"Error retrieving ratings: {str(e)}")
+        finally:
+            cur.close()
+
+def iter_rating_export(itersize=None):
+    """Yield one row per rating through a server-side cursor.
+
+    Rows are (evaluation_id, participant_id, created_at, sample_type,
+    sample_index, model_id, model_name, rating), ordered by evaluation id.
+    At most itersize rows (EXPORT_ITERSIZE) are held in memory at a time.
+    """
+    itersize = itersize or int(os.getenv('EXPORT_ITERSIZE', '2000'))
+    with db_connection() as conn:
+        cur = conn.cursor(name='rating_export')
+        cur.itersize = itersize
+
+        try:
+            cur.execute("""
+                SELECT
+                    evaluation_id,
+                    participant_id,
+                    created_at,
+                    sample_type,
+                    sample_index,
+                    model_id,
+                    model_name,
+                    rating
+                FROM evaluation_ratings
+                ORDER BY evaluation_id
+            """)
+
+            for row in cur:
+                yield row
+
+        except Exception as e:
+            raise Exception(f"Error exporting ratings: {str(e)}")
+        finally:
+            cur.close()
 
 def get_evaluation_statistics():
     """Get statistics about evaluations"""
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+    with db_connection() as conn:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
     
-    try:
-        # Get average ratings by model from JSONB data
-        cur.execute("""
-            SELECT 
-                rating->>'model_id' as model_id,
-                rating->>'model_name' as model_name,
-                COUNT(*) as total_ratings,
-                ROUND(AVG((rating->>'rating')::numeric), 2) as average_rating,
-                MIN((rating->>'rating')::integer) as min_rating,
-                MAX((rating->>'rating')::integer) as max_rating
-            FROM evaluations e,
-                 jsonb_array_elements(e.evaluation_data->'ratings') as rating
-            GROUP BY rating->>'model_id', rating->>'model_name'
-            ORDER BY rating->>'model_id'
-        """)
-        
-        model_stats = cur.fetchall()
-        
-        # Get total participants
-        cur.execute("SELECT COUNT(*) as total_participants FROM participants")
-        participant_count = cur.fetchone()['total_participants']
-        
-        # Get total evaluations
-        cur.execute("SELECT COUNT(*) as total_evaluations FROM evaluations")
-        evaluation_count = cur.fetchone()['total_evaluations']
-        
-        return {
-            'model_statistics': model_stats,
-            'total_participants': participant_count,
-            'total_evaluations': evaluation_count
-        }
+        try:
+            # Get per-model ratings from the rollup table (O(models x samples))
+            cur.execute("""
+                SELECT 
+                    model_id,
+                    MAX(model_name) as model_name,
+                    SUM(rating_count)::bigint as total_ratings,
+                    ROUND(SUM(rating_sum)::numeric / NULLIF(SUM(rating_count), 0), 2) as average_rating,
+                    ROUND(SQRT(GREATEST(
+                        (SUM(rating_sum_sq) - SUM(rating_sum)::numeric * SUM(rating_sum) / SUM(rating_count))
+                        / NULLIF(SUM(rating_count) - 1, 0), 0)), 2) as stddev_rating,
+                    MIN(rating_min) as min_rating,
+                    MAX(rating_max) as max_rating
+                FROM rating_rollups
+                WHERE rating_count > 0
+                GROUP BY model_id
+                ORDER BY model_id
+            """)
         
-    except Exception as e:
-        raise Exception(f"Error retrieving statistics: {str(e)}")
-    finally:
-        cur.close()
-        conn.close()
+            model_stats = cur.fetchall()
+        
+            # Get total participants
+            cur.execute("SELECT COUNT(*) as total_participants FROM participants")
+            participant_count = cur.fetchone()['total_participants']
+        
+            # Get total evaluations
+            cur.execute("SELECT COUNT(*) as total_evaluations FROM evaluations")
+            evaluation_count = cur.fetchone()['total_evaluations']
+        
+            return {
+                'model_statistics': model_stats,
+                'total_participants': participant_count,
+                'total_evaluations': evaluation_count
+            }
+        
+        except Exception as e:
+            raise Exception(f"Error retrieving statistics: {str(e)}")
+        finally:
+            cur.close()
+
+def rebuild_rating_rollups():
+    """Rebuild rating_rollups from every stored evaluation (one-shot backfill)"""
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            # Block concurrent submissions so none are counted twice or missed
+            cur.execute("LOCK TABLE evaluations IN SHARE MODE")
+            cur.execute("DELETE FROM rating_rollups")
+            cur.execute("""
+                INSERT INTO rating_rollups (
+                    model_id, sample_type, sample_index, model_name,
+                    rating_count, rating_sum, rating_sum_sq, rating_min, rating_max
+                )
+                SELECT
+                    model_id, sample_type, sample_index, MAX(model_name),
+                    COUNT(*), SUM(rating), SUM(rating * rating), MIN(rating), MAX(rating)
+                FROM evaluation_ratings
+                GROUP BY model_id, sample_type, sample_index
+            """)
+            rows = cur.rowcount
+            cur.execute("SELECT pg_notify(%s, 'rebuild')", (EVALUATIONS_CHANNEL,))
+            conn.commit()
+            return rows
+
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error rebuilding rating rollups: {str(e)}")
+        finally:
+            cur.close()
+
+def compact_evaluations(version, batch_size=1000):
+    """Rewrite legacy evaluation payloads in the compact format of version.
+
+    Walks evaluations by id in batches of batch_size, committing each batch,
+    so it can be interrupted and rerun. Payloads that do not match the
+    manifest (e.g. rated against an older dataset) are left as they are;
+    the ratings themselves, and therefore the rollups, do not change.
+    Returns (converted, skipped).
+    """
+    store_manifest(version)
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            cur.execute("""
+                SELECT rating_key, sample_type, sample_index, model_id,
+                       model_name, audio_path, original_text
+                FROM dataset_manifests
+                WHERE version = %s
+                ORDER BY slot
+            """, (version,))
+            columns = [column.name for column in cur.description]
+            slots = [dict(zip(columns, row)) for row in cur.fetchall()]
+
+            converted = skipped = 0
+            after_id = 0
+            while True:
+                cur.execute("""
+                    SELECT id, evaluation_data FROM evaluations
+                    WHERE id > %s AND evaluation_data ? 'ratings'
+                    ORDER BY id
+                    LIMIT %s
+                """, (after_id, batch_size))
+                rows = cur.fetchall()
+                if not rows:
+                    break
+                after_id = rows[-1][0]
+
+                updates = []
+                for evaluation_id, evaluation_data in rows:
+                    compact = compact_evaluation(evaluation_data, version, slots)
+                    if compact is None:
+                        skipped += 1
+                    else:
+                        updates.append((evaluation_id, json.dumps(compact)))
+                if updates:
+                    execute_values(cur, """
+                        UPDATE evaluations AS e SET evaluation_data = v.data::jsonb
+                        FROM (VALUES %s) AS v(id, data)
+                        WHERE e.id = v.id
+                    """, updates)
+                conn.commit()
+                converted += len(updates)
+
+            return converted, skipped
+
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error compacting evaluations: {str(e)}")
+        finally:
+            cur.close()
 
 def check_participant_exists(email):
     """Check if participant with email already exists"""
-    conn = get_db_connection()
-    cur = conn.cursor()
+    with db_connection() as conn:
+        cur = conn.cursor()
     
-    try:
-        cur.execute("""
-            SELECT id, name FROM participants WHERE email = %s
-        """, (email,))
+        try:
+            cur.execute("""
+                SELECT id, name FROM participants WHERE email = %s
+            """, (email,))
         
-        result = cur.fetchone()
-        return result
+            result = cur.fetchone()
+            return result
         
-    except Exception as e:
-        raise Exception(f"Error checking participant: {str(e)}")
-    finally:
-        cur.close()
-        conn.close()
+        except Exception as e:
+            raise Exception(f"Error checking participant: {str(e)}")
+        finally:
+            cur.close()
+
+def ping():
+    """Round trip to the database (health check); raises when it is unreachable"""
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+        except Exception as e:
+            raise Exception(f"Error pinging database: {str(e)}")
+        finally:
+            cur.close()
 
-def get_all_participants():
-    """Retrieve all participants with their submission count"""
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+# Participant names as shown on the Statistik page: first and last letter kept
+_MASKED_NAME = """
+    CASE WHEN char_length(p.name) <= 2
+         THEN left(p.name, 1) || repeat('*', char_length(p.name) - 1)
+         ELSE left(p.name, 1) || repeat('*', char_length(p.name) - 2) || right(p.name, 1)
+    END
+"""
+
+def get_participants_page(after=None, limit=50):
+    """Return up to limit participants, newest first, with masked names.
+
+    after is the (created_at, id) of the last row of the previous page
+    (keyset pagination over idx_participants_created_at_id), so every page
+    costs the same however deep it is. Evaluation counts come from
+    idx_evaluations_participant. Emails are not returned.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
     
-    try:
-        cur.execute("""
-            SELECT 
-                p.id,
-                p.name,
-                p.email,
-                p.created_at,
-                COUNT(e.id) as total_evaluations
-            FROM participants p
-            LEFT JOIN evaluations e ON p.id = e.participant_id
-            GROUP BY p.id, p.name, p.email, p.created_at
-            ORDER BY p.created_at DESC
-        """)
-        
-        return cur.fetchall()
+        try:
+            keyset = "WHERE (p.created_at, p.id) < (%(created_at)s, %(id)s)" if after else ""
+            cur.execute("""
+                SELECT 
+                    p.id,
+                    """ + _MASKED_NAME + """ as name,
+                    p.created_at,
+                    (
+                        SELECT COUNT(*) FROM evaluations e
+                        WHERE e.participant_id = p.id
+                    ) as total_evaluations
+                FROM participants p
+                """ + keyset + """
+                ORDER BY p.created_at DESC, p.id DESC
+                LIMIT %(limit)s
+            """, {
+                'created_at': after[0] if after else None,
+                'id': after[1] if after else None,
+                'limit': limit,
+            })
         
-    except Exception as e:
-        raise Exception(f"Error retrieving participants: {str(e)}")
-    finally:
-        cur.close()
-        conn.close()
+            return cur.fetchall()
+        
+        except Exception as e:
+            raise Exception(f"Error retrieving participants: {str(e)}")
+        finally:
+            cur.close()
 
 if __name__ == "__main__":
+    import sys
+
     # Initialize database when run directly
     try:
         init_database()
         print("Database initialized successfully!")
+        if '--backfill-rollups' in sys.argv:
+            rows = rebuild_rating_rollups()
+            print(f"Rating rollups rebuilt ({rows} rows)")
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,290 @@
+"""
+Immutable, versioned index of final_dataset.json (generated by
+build_dataset.py from dataset_config.json).
+
+The dataset is compiled once per process into per-language sample tuples.
+MODEL_REGISTRY is the single place that maps the rating columns (models A-F)
+to dataset fields; the form, the submit handler and the tooling all iterate
+over the compiled index instead of rebuilding model lists.
+
+Evaluations are stored compactly as {"v": 2, "manifest": <dataset version>,
+"r": [rating per slot]}, one small integer per rating key in form order
+(0 = not rated). The manifest of a version (what each slot refers to) is
+stored once in the database; older payloads list full rating entries under
+"ratings" and are still read everywhere. Manifests of payloads waiting in the
+submission spool are also archived on disk (MANIFEST_ARCHIVE_DIR), so they
+can still be stored after final_dataset.json changes.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+
+DATASET_PATH = 'final_dataset.json'
+
+# Manifests of earlier dataset versions, one <version>.json each
+MANIFEST_ARCHIVE_DIR = 'dataset_manifests'
+
+# Format version of compact evaluation payloads (legacy payloads have none)
+EVALUATION_FORMAT = 2
+
+# Fields a manifest slot contributes to an expanded rating entry
+SLOT_FIELDS = ('sample_type', 'sample_index', 'model_id', 'model_name', 'audio_path', 'original_text')
+
+@dataclass(frozen=True)
+class ModelSpec:
+    model_id: str
+    model_name: str
+    field: str
+
+@dataclass(frozen=True)
+class Language:
+    sample_type: str
+    label: str
+    heading: str
+
+# Evaluated languages, in the order they appear on the form
+LANGUAGES = (
+    Language('sunda', 'Sunda', 'Sunda'),
+    Language('indonesian', 'Indonesia', 'Bahasa Indonesia'),
+)
+
+# Models rated for each language, in column order
+MODEL_REGISTRY = MappingProxyType({
+    'sunda': (
+        ModelSpec('A', 'FastPitch+HiFi-GAN (Pretrained)', 'pretrained_fastpitch_audio'),
+        ModelSpec('B', 'FastPitch+HiFi-GAN (Fine-tuned)', 'finetuned_fastpitch_audio'),
+        ModelSpec('C', 'VITS (Pretrained)', 'pretrained_vits'),
+        ModelSpec('D', 'VITS (Fine-tuned)', 'finetuned_vits'),
+    ),
+    'indonesian': (
+        ModelSpec('E', 'VITS (Pretrained)', 'pretrained_vits'),
+        ModelSpec('F', 'VITS (Fine-tuned)', 'finetuned_vits'),
+    ),
+})
+
+# Pretrained -> fine-tuned model pairs compared with paired significance tests
+MODEL_PAIRS = (('A', 'B'), ('C', 'D'), ('E', 'F'))
+
+# Every dataset field that holds an audio path
+AUDIO_FIELDS = ('original_audio',) + tuple(dict.fromkeys(
+    model.field for models in MODEL_REGISTRY.values() for model in models
+))
+
+@dataclass(frozen=True)
+class ModelOutput:
+    model: ModelSpec
+    audio_path: str
+    rating_key: str
+
+@dataclass(frozen=True)
+class Sample:
+    sample_type: str
+    index: int
+    original_audio: str
+    original_text: str
+    outputs: tuple
+
+    def audio_paths(self):
+        """Original and model audio paths of this sample"""
+        return (self.original_audio,) + tuple(
+            output.audio_path for output in self.outputs if output.audio_path
+        )
+
+@dataclass(frozen=True)
+class DatasetIndex:
+    version: str
+    samples: MappingProxyType
+    rating_keys: tuple
+
+    def iter_samples(self):
+        """Return (language, sample) pairs in form order"""
+        return tuple(
+            (language, sample)
+            for language in LANGUAGES
+            for sample in self.samples[language.sample_type]
+        )
+
+    def iter_outputs(self):
+        """Yield (sample, output) for every rating on the form"""
+        for language in LANGUAGES:
+            for sample in self.samples[language.sample_type]:
+                for output in sample.outputs:
+                    yield sample, output
+
+    def audio_paths(self):
+        """Every distinct audio path referenced by the dataset"""
+        paths = {}
+        for _, sample in self.iter_samples():
+            paths.update(dict.fromkeys(sample.audio_paths()))
+        return tuple(paths)
+
+    def manifest(self):
+        """One slot per rating key, in the order of compact rating arrays"""
+        return [{
+            'rating_key': output.rating_key,
+            'sample_type': sample.sample_type,
+            'sample_index': sample.index,
+            'model_id': output.model.model_id,
+            'model_name': output.model.model_name,
+            'audio_path': output.audio_path,
+            'original_text': sample.original_text,
+        } for sample, output in self.iter_outputs()]
+
+    def encode_ratings(self, ratings):
+        """Compact evaluation payload from rating key -> rating"""
+        return {
+            'v': EVALUATION_FORMAT,
+            'manifest': self.version,
+            'r': [int(ratings.get(key, 0)) for key in self.rating_keys],
+        }
+
+def rating_key(sample_type, sample_index, model_id):
+    """Session-state key of one rating widget"""
+    return f"{sample_type}_{sample_index}_model_{model_id}"
+
+def sample_pair(a, b):
+    """Canonical (first, second) order of two (sample_type, index) samples"""
+    return (a, b) if a <= b else (b, a)
+
+def block_pairs(samples):
+    """Every sample_pair() within one block"""
+    return [
+        sample_pair(a, b)
+        for position, a in enumerate(samples)
+        for b in samples[position + 1:]
+    ]
+
+def pick_samples(candidates, count, quotas, pair_counts=None):
+    """Greedily build one block of count (sample_type, index) samples.
+
+    candidates is a list of ((sample_type, index), assigned_count) in
+    preference order; pair_counts maps sample_pair() to how often the two were
+    assigned together. Each step takes the candidate assigned least often,
+    then the one co-assigned least with the samples already taken, then the
+    earliest in order; once the open slots are only enough for the unmet
+    per-language quotas, only those languages are eligible.
+    """
+    pair_counts = pair_counts or {}
+    assigned = dict(candidates)
+    rank = {sample: position for position, (sample, _) in enumerate(candidates)}
+    concurrence = dict.fromkeys(rank, 0)
+    taken = dict.fromkeys(quotas, 0)
+    remaining = set(rank)
+    samples = []
+    while remaining and len(samples) < count:
+        unmet = {t for t in quotas if taken[t] < quotas[t]}
+        eligible = remaining
+        if sum(quotas[t] - taken[t] for t in unmet) >= count - len(samples):
+            eligible = [sample for sample in remaining if sample[0] in unmet]
+        best = min(eligible, key=lambda sample: (assigned[sample], concurrence[sample], rank[sample]))
+        remaining.discard(best)
+        samples.append(best)
+        if best[0] in taken:
+            taken[best[0]] += 1
+        for sample in remaining:
+            concurrence[sample] += pair_counts.get(sample_pair(best, sample), 0)
+    return samples
+
+def is_compact(evaluation_data):
+    """Whether a payload uses the compact rating array"""
+    return evaluation_data.get('v') == EVALUATION_FORMAT
+
+def expand_evaluation(evaluation_data, slots):
+    """Full rating entries of a payload; compact ones need their manifest slots"""
+    if not is_compact(evaluation_data):
+        return list(evaluation_data.get('ratings', []))
+    return [
+        dict({field: slot[field] for field in SLOT_FIELDS}, rating=rating)
+        for slot, rating in zip(slots, evaluation_data['r'])
+        if rating
+    ]
+
+def compact_evaluation(evaluation_data, version, slots):
+    """Compact form of a legacy payload, or None if it does not match the slots"""
+    positions = {
+        (slot['sample_type'], slot['sample_index'], slot['model_id']): position
+        for position, slot in enumerate(slots)
+    }
+    ratings = [0] * len(slots)
+    for entry in evaluation_data.get('ratings', []):
+        position = positions.get((entry['sample_type'], int(entry['sample_index']), entry['model_id']))
+        if position is None or ratings[position]:
+            return None
+        slot = slots[position]
+        # Entries recorded against other texts or audio keep their own copy
+        if any(entry.get(field) != slot[field] for field in ('model_name', 'audio_path', 'original_text')):
+            return None
+        rating = int(entry['rating'])
+        if rating <= 0:
+            return None
+        ratings[position] = rating
+    return {'v': EVALUATION_FORMAT, 'manifest': version, 'r': ratings}
+
+def draft_rating(value):
+    """Rating of a stored draft entry (a number, or a full entry in old drafts)"""
+    return value['rating'] if isinstance(value, dict) else value
+
+def compile_dataset(raw, version):
+    """Compile the raw dataset list into a DatasetIndex"""
+    samples = {language.sample_type: [] for language in LANGUAGES}
+    for entry in raw:
+        sample_type = entry['type']
+        if sample_type not in samples:
+            continue
+        idx = len(samples[sample_type])
+        outputs = tuple(
+            ModelOutput(model, entry.get(model.field), rating_key(sample_type, idx, model.model_id))
+            for model in MODEL_REGISTRY[sample_type]
+        )
+        samples[sample_type].append(Sample(
+            sample_type, idx, entry['original_audio'], entry['original_text'], outputs
+        ))
+
+    frozen = MappingProxyType({key: tuple(value) for key, value in samples.items()})
+    keys = tuple(
+        output.rating_key
+        for language in LANGUAGES
+        for sample in frozen[language.sample_type]
+        for output in sample.outputs
+    )
+    return DatasetIndex(version, frozen, keys)
+
+@lru_cache(maxsize=4)
+def load_dataset_index(path=DATASET_PATH):
+    """Compile the dataset file once per process"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    version = hashlib.sha256(content).hexdigest()[:12]
+    return compile_dataset(json.loads(content), version)
+
+def _archive_path(version):
+    return os.path.join(MANIFEST_ARCHIVE_DIR, f"{version}.json")
+
+def load_manifest(version):
+    """Manifest slots of a dataset version: the current one or an archived one"""
+    index = load_dataset_index()
+    if index.version == version:
+        return index.manifest()
+    try:
+        with open(_archive_path(version), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise Exception(
+            f"Unknown dataset version: {version} (not the current dataset and not in {MANIFEST_ARCHIVE_DIR}/)"
+        )
+
+def archive_manifest(version):
+    """Keep the manifest of version on disk, so it outlives dataset rebuilds"""
+    path = _archive_path(version)
+    if os.path.exists(path):
+        return
+    slots = load_manifest(version)
+    os.makedirs(MANIFEST_ARCHIVE_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(slots, f)
+    os.replace(tmp, path)
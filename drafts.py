@@ -0,0 +1,127 @@
+"""
+Debounced autosave of in-progress ratings.
+
+Each browser session gets a draft token kept in the page URL (?draft=...), so
+a reload or a dropped connection restores the participant's name, email and
+ratings. Rating clicks only touch st.session_state; autosave_draft() runs as
+a fragment every DRAFT_FLUSH_SECONDS and writes only the ratings that changed
+since the last flush. Submitting promotes the stored draft in place, sending
+just the changes made since that flush.
+"""
+
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+import streamlit as st
+from dataset_index import draft_rating
+from storage import get_draft, promote_draft, save_draft
+from metrics import increment
+from startup import load_env
+
+# Read at import (the fragment interval is fixed when it is defined)
+load_env()
+FLUSH_SECONDS = float(os.getenv('DRAFT_FLUSH_SECONDS', '5'))
+
+_TOKEN = re.compile(r'^[0-9a-f]{32}$')
+
+def drafts_enabled():
+    """Autosave needs synchronous storage (not the write-behind queue)"""
+    return FLUSH_SECONDS > 0 and os.getenv('SUBMISSION_MODE', 'sync') == 'sync'
+
+def draft_token():
+    """This session's draft token, created and put in the URL on first use"""
+    token = st.query_params.get('draft')
+    if not token or not _TOKEN.match(token):
+        token = uuid.uuid4().hex
+        st.query_params['draft'] = token
+    return token
+
+def new_draft_token():
+    """Start a fresh draft (after the current one was submitted)"""
+    token = uuid.uuid4().hex
+    st.query_params['draft'] = token
+    return token
+
+def restore_draft():
+    """Load this session's draft into session state (once per session)"""
+    if 'draft_saved' in st.session_state:
+        return
+    st.session_state.draft_saved = {'name': '', 'email': '', 'ratings': {}}
+    st.session_state.draft_flushed_at = 0.0
+    try:
+        draft = get_draft(draft_token())
+    except Exception as e:
+        print(f"Could not load draft: {str(e)}")
+        return
+    if draft is None:
+        return
+    if draft['submitted']:
+        new_draft_token()
+        return
+
+    ratings = {key: draft_rating(value) for key, value in draft['ratings'].items()}
+    st.session_state.participant_name = draft['name'] or ''
+    st.session_state.participant_email = draft['email'] or ''
+    st.session_state.responses = dict(ratings)
+    for key, rating in ratings.items():
+        st.session_state[key] = rating
+    st.session_state.draft_saved = {
+        'name': draft['name'] or '',
+        'email': draft['email'] or '',
+        'ratings': ratings,
+    }
+    increment('draft.restored')
+
+def pending_changes(dataset_index):
+    """Ratings changed since the last flush, as rating key -> rating"""
+    saved = st.session_state.draft_saved['ratings']
+    responses = st.session_state.get('responses', {})
+    return {
+        key: responses[key]
+        for key in dataset_index.rating_keys
+        if key in responses and saved.get(key) != responses[key]
+    }
+
+def _mark_saved(name, email, changes):
+    saved = st.session_state.draft_saved
+    saved['name'] = name
+    saved['email'] = email
+    saved['ratings'].update(changes)
+    st.session_state.draft_flushed_at = time.monotonic()
+
+def flush_draft(dataset_index):
+    """Write pending changes if any and the last flush is old enough"""
+    if time.monotonic() - st.session_state.draft_flushed_at < FLUSH_SECONDS:
+        return
+    name = st.session_state.get('participant_name', '')
+    email = st.session_state.get('participant_email', '')
+    changes = pending_changes(dataset_index)
+    saved = st.session_state.draft_saved
+    if not changes and name == saved['name'] and email == saved['email']:
+        return
+    try:
+        save_draft(draft_token(), name, email, changes)
+    except Exception as e:
+        increment('draft.error')
+        print(f"Draft autosave failed: {str(e)}")
+        return
+    increment('draft.flush')
+    increment('draft.ratings_written', len(changes))
+    _mark_saved(name, email, changes)
+    st.session_state.draft_saved_time = datetime.now().strftime("%H:%M:%S")
+
+@st.fragment(run_every=FLUSH_SECONDS if FLUSH_SECONDS > 0 else None)
+def autosave_draft(dataset_index):
+    """Periodically flush the draft; rating clicks never write directly"""
+    flush_draft(dataset_index)
+    if st.session_state.get('draft_saved_time'):
+        st.caption(f"💾 Draft tersimpan otomatis pukul {st.session_state.draft_saved_time}")
+
+def submit_draft(dataset_index, name, email, allow_duplicate=False):
+    """Promote the draft to an evaluation; returns (participant_id, duplicate)"""
+    changes = pending_changes(dataset_index)
+    result = promote_draft(draft_token(), name, email, changes, dataset_index.version, allow_duplicate)
+    _mark_saved(name, email, changes)
+    return result
@@ -0,0 +1,139 @@
+"""
+Streaming export of every rating, one row per rating.
+
+Rows come from storage.iter_rating_export (a named server-side cursor on
+Postgres) and are written in chunks of EXPORT_CHUNK_ROWS, so memory use
+stays constant however many evaluations are stored. Participant names and
+emails are not exported.
+
+Usage:
+    python export.py --format csv --output ratings.csv
+    python export.py --format parquet --output ratings.parquet
+"""
+
+import argparse
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+from itertools import islice
+from metrics import timer
+from storage import iter_rating_export
+
+EXPORT_COLUMNS = (
+    'evaluation_id',
+    'participant_id',
+    'created_at',
+    'sample_type',
+    'sample_index',
+    'model_id',
+    'model_name',
+    'rating',
+)
+
+FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+def _chunk_size():
+    return int(os.getenv('EXPORT_CHUNK_ROWS', '10000'))
+
+def _chunks(rows, size):
+    """Split an iterable into lists of at most size rows"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def write_csv(rows, f, chunk_size):
+    """Write rows as CSV to a binary file; return the row count"""
+    text = io.TextIOWrapper(f, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for chunk in _chunks(rows, chunk_size):
+        writer.writerows(chunk)
+        count += len(chunk)
+    text.flush()
+    text.detach()
+    return count
+
+def write_parquet(rows, f, chunk_size):
+    """Write rows as Parquet (one row group per chunk); return the row count"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise Exception("Parquet export requires pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([
+        ('evaluation_id', pa.int64()),
+        ('participant_id', pa.int64()),
+        ('created_at', pa.timestamp('us')),
+        ('sample_type', pa.string()),
+        ('sample_index', pa.int32()),
+        ('model_id', pa.string()),
+        ('model_name', pa.string()),
+        ('rating', pa.int8()),
+    ])
+    count = 0
+    with pq.ParquetWriter(f, schema) as writer:
+        for chunk in _chunks(rows, chunk_size):
+            columns = list(zip(*chunk))
+            writer.write_batch(pa.record_batch(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+            count += len(chunk)
+    return count
+
+WRITERS = {
+    'csv': write_csv,
+    'parquet': write_parquet,
+}
+
+def export_ratings(f, fmt='csv'):
+    """Stream every rating into binary file f; return the row count"""
+    if fmt not in WRITERS:
+        raise Exception(f"Unknown export format: {fmt}")
+    with timer(f'export.{fmt}'):
+        return WRITERS[fmt](iter_rating_export(), f, _chunk_size())
+
+def export_bytes(fmt='csv'):
+    """Export through an anonymous temporary file and return its contents.
+
+    Used as the deferred data of st.download_button, which only accepts
+    bytes, str and a few stream types (not the BufferedRandom of a
+    TemporaryFile); the rows are still streamed, only the finished file is
+    held in memory.
+    """
+    with tempfile.TemporaryFile() as f:
+        export_ratings(f, fmt)
+        f.seek(0)
+        return f.read()
+
+def main():
+    parser = argparse.ArgumentParser(description="Export every rating as CSV or Parquet")
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+    parser.add_argument('--output', help="output file (default ratings.<format>)")
+    args = parser.parse_args()
+
+    path = args.output or f"ratings.{args.format}"
+    start = time.perf_counter()
+    try:
+        with open(path, 'wb') as f:
+            rows = export_ratings(f, args.format)
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    elapsed = time.perf_counter() - start
+    print(f"Exported {rows} ratings to {path} in {elapsed:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +0,0 @@
-original_sunda_samples = [
-    {"audio_filepath": "./original_sunda/sum_04511_00326032573.wav", "text": "ayeuna stadion jalak harupat tiasa dipilarian dina peta", "duration": 4.048843537414966},
-{"audio_filepath": "./original_sunda/sum_04511_00456788259.wav", "text": "turis mancanagara keur ningali gerhana bulan poe senen di libya", "duration": 4.28204081632653},
-{"audio_filepath": "./original_sunda/sum_04511_00556982240.wav", "text": "dina bulan puasa taun sarebu salapan ratus salapan puluh genep seueur umat islam nu ngalakonan ibadah umroh", "duration": 7.511972789115647},
-{"audio_filepath": "./original_sunda/sum_04511_00660901768.wav", "text": "ayeuna omset warung pasta ningkat dugi ka sapuluh juta rupiah", "duration": 4.414739229024943},
-{"audio_filepath": "./original_sunda/sum_04511_01079778287.wav", "text": "seniman nuju ngalukis sirkuit valencia", "duration": 3.120408163265306},
-{"audio_filepath": "./original_sunda/sum_04511_01167436082.wav", "text": "kompleks perumahan anu caket museum benda kuno keraton kasepuhan agreung pisan", "duration": 5.803764172335601},
-{"audio_filepath": "./original_sunda/sum_04511_01248777749.wav", "text": "panonton ting haruleng ningali beyonce keur nyanyi di tipi", "duration": 3.9859863945578233},
-{"audio_filepath": "./original_sunda/sum_04511_01393308271.wav", "text": "panonton ting haruleng ningali hillary clinton keur nyanyi di tipi", "duration": 4.547120181405896},
-{"audio_filepath": "./original_sunda/sum_04511_01598659259.wav", "text": "panonton ting haruleng ningali marc markwes keur nyanyi di tipi", "duration": 4.627301587301587},
-{"audio_filepath": "./original_sunda/sum_04511_01638446422.wav", "text": "loba rumaja ulin ka waduk saguling", "duration": 3.0131972789115644},
-]
-
-original_indonesian_samples = [
-{"audio_filepath": "/P2/output/indonesian_dataset/wavs_resampled/a_TVRI_BS_071119_0246.wav", "text": "Selain itu Wakil Panglima juga bertugas melaksanakan tugas Panglima apabila Panglima berhalangan sementara waktu dan atau berhalangan tetap dan melaksanakan tugas lain yang diperintahkan oleh Panglima.", "duration": 13.439954648526077},
-{"audio_filepath": "/P2/output/indonesian_dataset/wavs_resampled/a_TVRI_BS_071119_0265.wav", "text": "Deputi Gubernur Bank Indonesia Dodi Budi Waluyo menjelaskan masalah global menjadi salah satu penyebab utama ekonomi dunia yang semuanya terdampak oleh perang dagang.", "duration": 10.479954648526077},
-{"audio_filepath": "/P2/output/indonesian_dataset/wavs_resampled/a_TVRI_BS_071119_0177.wav", "text": "Dan berdasarkan keterangan dari keluarga Sri Rahayu merupakan TKI legal", "duration": 9.199954648526077},
-{"audio_filepath": "/P2/output/indonesian_dataset/wavs_resampled/a_TVRI_BS_071119_0319.wav", "text": "Mereka juga menggunakan gawai atau gadget", "duration": 4.239954648526077},
-{"audio_filepath": "/P2/output/indonesian_dataset/wavs_resampled/a_TVRI_BS_071119_0383.wav", "text": "Vote melalui SMS polling ke nomor 99386 atau vote melalui aplikasi video.com blibli.com dan melalui situs pga.blibli.com", "duration": 11.839954648526078},
-{"audio_filepath": "/P2/output/indonesian_dataset/wavs_resampled/r_TVRI_BS_071119_0265.wav", "text": "Deputi Gubernur Bank Indonesia Dodi Budi Waluyo menjelaskan masalah global menjadi salah satu penyebab utama ekonomi dunia yang semuanya terdampak oleh perang dagang.", "duration": 10.839954648526078},
-{"audio_filepath": "/P2/output/indonesian_dataset/wavs_resampled/r_TVRI_BS_071119_0246.wav", "text": "Selain itu Wakil Panglima juga bertugas melaksanakan tugas Panglima apabila Panglima berhalangan sementara waktu dan atau berhalangan tetap dan melaksanakan tugas lain yang diperintahkan oleh Panglima.", "duration": 12.679954648526078},
-{"audio_filepath": "/P2/output/indonesian_dataset/wavs_resampled/r_TVRI_BS_071119_0169.wav", "text": "Sementara memang hasil report medikalnya belum kita dapatkan.", "duration": 4.759954648526077},
-{"audio_filepath": "/P2/output/indonesian_dataset/wavs_resampled/r_TVRI_BS_071119_0089.wav", "text": "Kabarnya Menteri Pendidikan Republik Indonesia Menteri Nadiem Makarim melakukan sidak dan juga meninjau secara langsung 4 ruang kelas yang ambruk beberapa saat yang lalu.", "duration": 11.439954648526077},
-{"audio_filepath": "/P2/output/indonesian_dataset/wavs_resampled/r_TVRI_BS_071119_0215.wav", "text": "Dalam sambutannya Kepala Negara mengungkapkan 55 tahun merupakan usia yang matang bagi partai politik.", "duration": 7.4799546485260775}],
@@ -1,20 +1,95 @@
 import streamlit as st
-import json
+import streamlit.components.v1 as components
 import os
+import time
+from itertools import groupby
 from datetime import datetime
-from database import (
+from storage import (
     init_database,
-    save_participant, 
-    save_evaluation,
-    get_evaluation_statistics,
-    check_participant_exists
+    submit_evaluation
 )
+from stats_cache import get_cached_statistics
+from submission_queue import enqueue_submission, start_worker
+from drafts import autosave_draft, drafts_enabled, restore_draft, submit_draft
+from scheduler import session_samples
+from audio_cache import audio_exists, audio_url, get_audio, prefetch_audio, prefetch_links
+from dataset_index import load_dataset_index
+from metrics import increment, observe, timed, timer
+from startup import load_env, start_warm_up
 
-# Load the dataset
-@st.cache_data
-def load_dataset():
-    with open('final_dataset.json', 'r') as f:
-        return json.load(f)
+# Rating scale shown on every radio
+RATING_LABELS = {5: 'Excellent', 4: 'Good', 3: 'Fair', 2: 'Poor', 1: 'Bad'}
+
+def play_audio(path):
+    """Render an audio player from a static URL or the shared audio cache"""
+    url, mime = audio_url(path)
+    if url:
+        st.audio(url, format=mime)
+        return
+    data, mime = get_audio(path)
+    st.audio(data, format=mime)
+
+@st.fragment
+@timed('render.sample')
+def render_sample(language, sample):
+    """Render one sample block; a rating click reruns only this fragment"""
+    st.markdown("---")
+    st.subheader(f"📁 Sampel {language.label} #{sample.index + 1}")
+    st.markdown(f"**File:** `{sample.original_audio}`")
+    
+    # Original Audio and Text
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.markdown("**🎵 Audio Original:**")
+        if audio_exists(sample.original_audio):
+            play_audio(sample.original_audio)
+        else:
+            st.warning("File audio tidak ditemukan")
+    
+    with col2:
+        st.markdown("**📝 Transkrip Original:**")
+        st.info(sample.original_text)
+    
+    st.markdown("#### Evaluasi Model")
+    
+    # One column per model
+    cols = st.columns(len(sample.outputs))
+    
+    for col_idx, output in enumerate(sample.outputs):
+        with cols[col_idx]:
+            st.markdown(f"**Model {output.model.model_id}**")
+            st.caption(output.model.model_name)
+            if output.audio_path and audio_exists(output.audio_path):
+                play_audio(output.audio_path)
+            else:
+                st.warning("Audio tidak tersedia")
+            
+            # Paged mode: a radio left off screen loses its state, so seed it
+            # from the saved rating when its page is shown again
+            if output.rating_key not in st.session_state and output.rating_key in st.session_state.responses:
+                st.session_state[output.rating_key] = st.session_state.responses[output.rating_key]
+            
+            # Rating
+            rating = st.radio(
+                f"Penilaian Model {output.model.model_id}:",
+                options=list(RATING_LABELS),
+                format_func=lambda x: f"{x} - {RATING_LABELS[x]}",
+                key=output.rating_key,
+                horizontal=False
+            )
+            st.session_state.responses[output.rating_key] = rating
+
+def render_hidden_html(html):
+    """Render html in an invisible iframe (for prefetch hints)"""
+    if hasattr(st, 'iframe'):
+        # Streamlit 1.56+ replaces components.html with st.iframe
+        st.iframe(html, height=1)
+    else:
+        components.html(html, height=0)
+
+def go_to_page(page):
+    """Move the wizard to another page"""
+    st.session_state.form_page = page
 
 def statistics_page():
     """Display statistics page"""
@@ -24,7 +99,7 @@ def statistics_page():
     st.markdown("---")
     
     try:
-        stats = get_evaluation_statistics()
+        stats = get_cached_statistics()
         
         st.subheader("📈 Ringkasan Statistik")
         col1, col2 = st.columns(2)
@@ -54,6 +129,12 @@ def statistics_page():
 def main():
     st.set_page_config(page_title="MOS Evaluation Form - Lagi Bentar", layout="wide")
     
+    # Settings below are read from .env; the warm-up thread may not have loaded it yet
+    load_env()
+    
+    # Without serve.py, warm the remaining caches while the introduction is read
+    start_warm_up()
+    
     # Title and Introduction
     st.title("🎙️ Mean Opinion Score (MOS) Evaluation Form")
     st.markdown("---")
@@ -96,10 +177,17 @@ def main():
     
     st.markdown("---")
     
-    # Load dataset
-    dataset = load_dataset()
-    sunda_samples = [s for s in dataset if s['type'] == 'sunda']
-    indonesian_samples = [s for s in dataset if s['type'] == 'indonesian']
+    # Spooled submissions from a previous run are flushed in the background
+    if os.getenv('SUBMISSION_MODE', 'sync') == 'queue':
+        start_worker()
+    
+    # Load dataset (compiled once per process)
+    with timer('render.dataset_load'):
+        dataset_index = load_dataset_index()
+    
+    # Reload or reconnect: restore this session's autosaved draft
+    if drafts_enabled():
+        restore_draft()
     
     # Participant Information
     st.header("📝 Informasi Partisipan")
@@ -112,193 +200,119 @@ def main():
     if 'responses' not in st.session_state:
         st.session_state.responses = {}
     
-    # SUNDA SECTIONS
-    st.header("🔊 Evaluasi Dataset Sunda")
-    st.markdown("Silakan dengarkan audio original dan audio dari setiap model, lalu berikan penilaian kualitas untuk masing-masing model.")
+    # Balanced subset when SAMPLES_PER_PARTICIPANT is set, otherwise every sample
+    samples = session_samples(dataset_index)
     
-    for idx, sample in enumerate(sunda_samples):
-        st.markdown("---")
-        st.subheader(f"📁 Sampel Sunda #{idx + 1}")
-        st.markdown(f"**File:** `{sample['original_audio']}`")
+    # Optional wizard mode: FORM_PAGE_SIZE samples per page (0 = single page)
+    page_size = int(os.getenv('FORM_PAGE_SIZE', '0'))
+    if page_size > 0:
+        pages = [samples[i:i + page_size] for i in range(0, len(samples), page_size)]
+    else:
+        pages = [samples]
+    page = min(st.session_state.get('form_page', 0), len(pages) - 1)
+    
+    if len(pages) > 1:
+        st.progress((page + 1) / len(pages), text=f"Halaman {page + 1} dari {len(pages)}")
+    
+    for section, (language, section_samples) in enumerate(groupby(pages[page], key=lambda item: item[0])):
+        if section > 0:
+            st.markdown("---")
+        st.header(f"🔊 Evaluasi Dataset {language.heading}")
+        st.markdown("Silakan dengarkan audio original dan audio dari setiap model, lalu berikan penilaian kualitas untuk masing-masing model.")
         
-        # Original Audio and Text
-        col1, col2 = st.columns([1, 2])
-        with col1:
-            st.markdown("**🎵 Audio Original:**")
-            if os.path.exists(sample['original_audio']):
-                st.audio(sample['original_audio'])
+        with timer(f"render.{language.sample_type}"):
+            for _, sample in section_samples:
+                render_sample(language, sample)
+    
+    if drafts_enabled():
+        autosave_draft(dataset_index)
+    
+    if len(pages) > 1:
+        if page + 1 < len(pages):
+            next_paths = [path for _, sample in pages[page + 1] for path in sample.audio_paths()]
+            if os.getenv('AUDIO_BASE_URL'):
+                # The browser fetches static URLs itself: have it cache the next page's audio
+                links = prefetch_links(next_paths)
+                if links:
+                    render_hidden_html(links)
             else:
-                st.warning("File audio tidak ditemukan")
-        
-        with col2:
-            st.markdown("**📝 Transkrip Original:**")
-            st.info(sample['original_text'])
+                # Only warms this process's byte cache: audio sent through
+                # Streamlit gets its media URL when the page renders, so the
+                # browser still downloads the next page's audio after the click
+                prefetch_audio(next_paths)
         
-        st.markdown("#### Evaluasi Model")
-        
-        # Create 4 columns for 4 models
-        cols = st.columns(4)
-        
-        models = [
-            ('A', 'FastPitch+HiFi-GAN (Pretrained)', sample['pretrained_fastpitch_audio']),
-            ('B', 'FastPitch+HiFi-GAN (Fine-tuned)', sample['finetuned_fastpitch_audio']),
-            ('C', 'VITS (Pretrained)', sample['pretrained_vits']),
-            ('D', 'VITS (Fine-tuned)', sample['finetuned_vits'])
-        ]
-        
-        for col_idx, (model_id, model_name, audio_path) in enumerate(models):
-            with cols[col_idx]:
-                st.markdown(f"**Model {model_id}**")
-                st.caption(model_name)
-                if audio_path and os.path.exists(audio_path):
-                    st.audio(audio_path)
-                else:
-                    st.warning("Audio tidak tersedia")
-                
-                # Rating
-                rating_key = f"sunda_{idx}_model_{model_id}"
-                rating = st.radio(
-                    f"Penilaian Model {model_id}:",
-                    options=[5, 4, 3, 2, 1],
-                    format_func=lambda x: f"{x} - {'Excellent' if x==5 else 'Good' if x==4 else 'Fair' if x==3 else 'Poor' if x==2 else 'Bad'}",
-                    key=rating_key,
-                    horizontal=False
-                )
-                st.session_state.responses[rating_key] = rating
-    
-    # INDONESIAN SECTIONS
-    st.markdown("---")
-    st.header("🔊 Evaluasi Dataset Bahasa Indonesia")
-    st.markdown("Silakan dengarkan audio original dan audio dari setiap model, lalu berikan penilaian kualitas untuk masing-masing model.")
-    
-    for idx, sample in enumerate(indonesian_samples):
         st.markdown("---")
-        st.subheader(f"📁 Sampel Indonesia #{idx + 1}")
-        st.markdown(f"**File:** `{sample['original_audio']}`")
-        
-        # Original Audio and Text
-        col1, col2 = st.columns([1, 2])
+        col1, col2 = st.columns(2)
         with col1:
-            st.markdown("**🎵 Audio Original:**")
-            if os.path.exists(sample['original_audio']):
-                st.audio(sample['original_audio'])
-            else:
-                st.warning("File audio tidak ditemukan")
-        
+            if page > 0:
+                st.button("⬅️ Sebelumnya", on_click=go_to_page, args=(page - 1,), use_container_width=True)
         with col2:
-            st.markdown("**📝 Transkrip Original:**")
-            st.info(sample['original_text'])
-        
-        st.markdown("#### Evaluasi Model")
+            if page + 1 < len(pages):
+                st.button("Selanjutnya ➡️", on_click=go_to_page, args=(page + 1,), type="primary", use_container_width=True)
         
-        # Create 2 columns for 2 models
-        cols = st.columns(2)
-        
-        models = [
-            ('E', 'VITS (Pretrained)', sample['pretrained_vits']),
-            ('F', 'VITS (Fine-tuned)', sample['finetuned_vits'])
-        ]
-        
-        for col_idx, (model_id, model_name, audio_path) in enumerate(models):
-            with cols[col_idx]:
-                st.markdown(f"**Model {model_id}**")
-                st.caption(model_name)
-                if audio_path and os.path.exists(audio_path):
-                    st.audio(audio_path)
-                else:
-                    st.warning("Audio tidak tersedia")
-                
-                # Rating
-                rating_key = f"indonesian_{idx}_model_{model_id}"
-                rating = st.radio(
-                    f"Penilaian Model {model_id}:",
-                    options=[5, 4, 3, 2, 1],
-                    format_func=lambda x: f"{x} - {'Excellent' if x==5 else 'Good' if x==4 else 'Fair' if x==3 else 'Poor' if x==2 else 'Bad'}",
-                    key=rating_key,
-                    horizontal=False
-                )
-                st.session_state.responses[rating_key] = rating
+        # Submit is only offered on the last page
+        if page + 1 < len(pages):
+            return
     
     # Submit Button
     st.markdown("---")
     st.header("✅ Submit Evaluasi")
     
+    # Shown after a submit was rejected because the email already exists
+    if st.session_state.get('duplicate_email') and st.session_state.duplicate_email == participant_email:
+        st.warning(f"⚠️ Email {participant_email} sudah pernah melakukan evaluasi sebelumnya.")
+        st.checkbox("Saya ingin submit evaluasi baru", key="override_submit")
+    
     if st.button("📤 Submit Evaluasi", type="primary", use_container_width=True):
         if not participant_name or not participant_email:
             st.error("⚠️ Mohon isi Nama dan Email sebelum submit!")
         else:
+            submit_start = time.perf_counter()
             try:
-                # Check if participant already submitted
-                existing = check_participant_exists(participant_email)
-                if existing:
-                    st.warning(f"⚠️ Email {participant_email} sudah pernah melakukan evaluasi sebelumnya.")
-                    if not st.checkbox("Saya ingin submit evaluasi baru", key="override_submit"):
-                        st.stop()
-                
-                # Save participant to database
-                participant_id = save_participant(participant_name, participant_email)
+                # Compact payload: one rating per slot of the dataset manifest
+                responses = st.session_state.responses
+                evaluation_data = dataset_index.encode_ratings(responses)
+                evaluation_count = sum(1 for key in dataset_index.rating_keys if key in responses)
                 
-                # Collect all evaluations into a JSON structure
-                evaluation_data = {
-                    'ratings': []
-                }
-                evaluation_count = 0
+                if os.getenv('SUBMISSION_MODE', 'sync') == 'queue':
+                    # Acknowledged once spooled to disk; a background worker
+                    # writes it to Postgres (no duplicate-email check here)
+                    submission_key = enqueue_submission(participant_name, participant_email, evaluation_data)
+                    receipt = f"Kode Submit: {submission_key[:8]}"
+                    print(f"Queued {evaluation_count} evaluations as {submission_key}")
+                else:
+                    # Duplicate check, participant and evaluation in one transaction
+                    if drafts_enabled():
+                        # Only ratings changed since the last autosave are sent
+                        participant_id, duplicate = submit_draft(
+                            dataset_index,
+                            participant_name,
+                            participant_email,
+                            allow_duplicate=st.session_state.get('override_submit', False)
+                        )
+                    else:
+                        participant_id, duplicate = submit_evaluation(
+                            participant_name,
+                            participant_email,
+                            evaluation_data,
+                            allow_duplicate=st.session_state.get('override_submit', False)
+                        )
+                    if participant_id is None:
+                        increment('submit.duplicate')
+                        # Rerun so the override checkbox is shown above the button
+                        st.session_state.duplicate_email = participant_email
+                        st.rerun()
 
-                print(f"Collecting evaluations for participant ID {participant_id}")
+                    st.session_state.pop('duplicate_email', None)
+                    receipt = f"Participant ID: {participant_id}"
+                    print(f"Saved {evaluation_count} evaluations for participant ID {participant_id}")
 
-                # Process Sunda evaluations
-                for idx, sample in enumerate(sunda_samples):
-                    models = [
-                        ('A', 'FastPitch+HiFi-GAN (Pretrained)', sample['pretrained_fastpitch_audio']),
-                        ('B', 'FastPitch+HiFi-GAN (Fine-tuned)', sample['finetuned_fastpitch_audio']),
-                        ('C', 'VITS (Pretrained)', sample['pretrained_vits']),
-                        ('D', 'VITS (Fine-tuned)', sample['finetuned_vits'])
-                    ]
-                    
-                    for model_id, model_name, audio_path in models:
-                        rating_key = f"sunda_{idx}_model_{model_id}"
-                        if rating_key in st.session_state.responses:
-                            rating = st.session_state.responses[rating_key]
-                            evaluation_data['ratings'].append({
-                                'sample_type': 'sunda',
-                                'sample_index': idx,
-                                'model_id': model_id,
-                                'model_name': model_name,
-                                'rating': rating,
-                                'audio_path': audio_path,
-                                'original_text': sample['original_text']
-                            })
-                            evaluation_count += 1
-                
-                # Process Indonesian evaluations
-                for idx, sample in enumerate(indonesian_samples):
-                    models = [
-                        ('E', 'VITS (Pretrained)', sample['pretrained_vits']),
-                        ('F', 'VITS (Fine-tuned)', sample['finetuned_vits'])
-                    ]
-                    
-                    for model_id, model_name, audio_path in models:
-                        rating_key = f"indonesian_{idx}_model_{model_id}"
-                        if rating_key in st.session_state.responses:
-                            rating = st.session_state.responses[rating_key]
-                            evaluation_data['ratings'].append({
-                                'sample_type': 'indonesian',
-                                'sample_index': idx,
-                                'model_id': model_id,
-                                'model_name': model_name,
-                                'rating': rating,
-                                'audio_path': audio_path,
-                                'original_text': sample['original_text']
-                            })
-                            evaluation_count += 1
-                
-                # Save all evaluations as a single JSON object
-                save_evaluation(participant_id, evaluation_data)
-                print(f"Saved {evaluation_count} evaluations for participant ID {participant_id}")
+                observe('submit', time.perf_counter() - submit_start)
+                increment('submit.success')
 
                 # Success messages
                 st.success(f"✅ Terima kasih {participant_name}! Evaluasi Anda telah berhasil disimpan ke database.")
-                st.info(f"📊 Total {evaluation_count} evaluasi tersimpan (Participant ID: {participant_id})")
+                st.info(f"📊 Total {evaluation_count} evaluasi tersimpan ({receipt})")
                 
                 # Additional confirmation message
                 st.markdown("""
@@ -321,6 +335,7 @@ def main():
                 st.balloons()
                     
             except Exception as e:
+                increment('submit.error')
                 st.error(f"❌ Error saat menyimpan evaluasi: {str(e)}")
 
 if __name__ == "__main__":
@@ -0,0 +1,160 @@
+"""
+Lightweight in-process timing and counting hooks.
+
+Durations are aggregated into fixed-bucket histograms keyed by operation
+name (e.g. "db.submit_evaluation", "render.sunda"). Other modules can
+register collectors that report gauges (pool, cache and queue counters).
+Everything can be rendered in the Prometheus text exposition format and
+written to a file for node_exporter's textfile collector.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_collectors = {}
+
+def observe(name, seconds):
+    """Record one duration for an operation"""
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = {
+                'buckets': [0] * len(BUCKETS),
+                'count': 0,
+                'sum': 0.0,
+                'max': 0.0,
+            }
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist['buckets'][i] += 1
+                break
+        hist['count'] += 1
+        hist['sum'] += seconds
+        hist['max'] = max(hist['max'], seconds)
+
+@contextmanager
+def timer(name):
+    """Time the enclosed block"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+def timed(name):
+    """Decorator that times every call of a function"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def increment(name, value=1):
+    """Increase a counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def register_collector(prefix, func):
+    """Report func()'s numeric values as gauges named prefix_<key>"""
+    _collectors[prefix] = func
+
+def quantile(hist, q):
+    """Estimate a quantile as the upper bound of the bucket that holds it"""
+    if not hist['count']:
+        return 0.0
+    target = q * hist['count']
+    seen = 0
+    for bound, count in zip(BUCKETS, hist['buckets']):
+        seen += count
+        if seen >= target:
+            return min(bound, hist['max'])
+    return hist['max']
+
+def snapshot():
+    """Return per-operation summaries, counters and collected gauges"""
+    with _lock:
+        histograms = {name: dict(h, buckets=list(h['buckets'])) for name, h in _histograms.items()}
+        counters = dict(_counters)
+
+    operations = {}
+    for name, hist in sorted(histograms.items()):
+        operations[name] = {
+            'count': hist['count'],
+            'mean_ms': hist['sum'] / hist['count'] * 1000 if hist['count'] else 0.0,
+            'p50_ms': quantile(hist, 0.5) * 1000,
+            'p95_ms': quantile(hist, 0.95) * 1000,
+            'max_ms': hist['max'] * 1000,
+            'total_s': hist['sum'],
+        }
+    return {
+        'operations': operations,
+        'histograms': histograms,
+        'counters': counters,
+        'gauges': collect_gauges(),
+    }
+
+def collect_gauges():
+    """Call every registered collector, skipping ones that fail"""
+    gauges = {}
+    for prefix, func in list(_collectors.items()):
+        try:
+            values = func()
+        except Exception:
+            continue
+        for key, value in values.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                gauges[f"{prefix}_{key}"] = value
+    return gauges
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+def render_prometheus():
+    """Render all metrics in the Prometheus text exposition format"""
+    data = snapshot()
+    lines = [
+        '# HELP mos_operation_seconds Duration of instrumented operations.',
+        '# TYPE mos_operation_seconds histogram',
+    ]
+    for name, hist in sorted(data['histograms'].items()):
+        label = f'operation="{_label(name)}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS, hist['buckets']):
+            cumulative += count
+            lines.append(f'mos_operation_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+        lines.append(f'mos_operation_seconds_bucket{{{label},le="+Inf"}} {hist["count"]}')
+        lines.append(f'mos_operation_seconds_sum{{{label}}} {hist["sum"]}')
+        lines.append(f'mos_operation_seconds_count{{{label}}} {hist["count"]}')
+
+    lines.append('# HELP mos_events_total Instrumented event counters.')
+    lines.append('# TYPE mos_events_total counter')
+    for name, value in sorted(data['counters'].items()):
+        lines.append(f'mos_events_total{{event="{_label(name)}"}} {value}')
+
+    lines.append('# HELP mos_gauge Pool, cache and queue gauges.')
+    lines.append('# TYPE mos_gauge gauge')
+    for name, value in sorted(data['gauges'].items()):
+        lines.append(f'mos_gauge{{name="{_label(name)}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+def write_prometheus_file(path=None):
+    """Atomically write the Prometheus text file and return its path"""
+    path = path or os.getenv('METRICS_PROM_PATH', 'mos_metrics.prom')
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+    return path
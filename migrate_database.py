@@ -1,36 +1,147 @@
 """
 Migration script to update database schema from individual evaluation rows to JSON format.
 Run this script if you have existing data that needs to be migrated.
+
+The old table is renamed to evaluations_backup and its rows are migrated in
+batches of MIGRATION_BATCH_SIZE participants (ordered by participant id).
+Each batch is written with COPY and committed together with a checkpoint in
+migration_checkpoints, so an interrupted run resumes from the last committed
+batch when the script is started again.
+
+Usage:
+    python migrate_database.py [--batch-size 500] [--yes]
 """
 
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import argparse
+import csv
+import io
 import json
-from database import get_db_connection
+import os
+import time
+from psycopg2 import sql
+from database import get_db_connection, init_database, rebuild_rating_rollups
 
-def migrate_to_json_format():
-    """Migrate old evaluation format to new JSON format"""
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    
+MIGRATION_NAME = 'evaluations_json'
+
+def _old_schema_exists(cur):
+    """True when the evaluations table still has one row per rating"""
+    cur.execute("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_name = 'evaluations'
+        AND column_name = 'sample_type'
+    """)
+    return cur.fetchone() is not None
+
+def _checkpoint(cur):
+    """Return (last_participant_id, participants, rows, completed) or None"""
+    cur.execute("SELECT to_regclass('migration_checkpoints')")
+    if cur.fetchone()[0] is None:
+        return None
+    cur.execute("""
+        SELECT last_participant_id, participants_migrated, rows_migrated, completed_at IS NOT NULL
+        FROM migration_checkpoints
+        WHERE name = %s
+    """, (MIGRATION_NAME,))
+    return cur.fetchone()
+
+def _rename_backup_relations(cur):
+    """Give the backup table's indexes and id sequence _backup names.
+
+    They keep their names when the table is renamed, and the new evaluations
+    table needs them: evaluations_pkey would clash, and CREATE INDEX IF NOT
+    EXISTS idx_evaluations_participant would silently skip the new table.
+    """
+    cur.execute("""
+        SELECT indexname
+        FROM pg_indexes
+        WHERE schemaname = current_schema() AND tablename = 'evaluations_backup'
+    """)
+    for (name,) in cur.fetchall():
+        if not name.endswith('_backup'):
+            cur.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                sql.Identifier(name), sql.Identifier(name[:56] + '_backup')
+            ))
+
+    cur.execute("SELECT pg_get_serial_sequence('evaluations_backup', 'id')")
+    sequence = cur.fetchone()[0]
+    if sequence:
+        cur.execute(sql.SQL("ALTER SEQUENCE {} RENAME TO evaluations_backup_id_seq").format(
+            sql.SQL(sequence)
+        ))
+
+def prepare_migration(conn):
+    """Move the old table aside and create the JSON table and checkpoint"""
+    cur = conn.cursor()
     try:
-        # Check if old schema exists
+        cur.execute("SELECT to_regclass('evaluations_backup')")
+        if cur.fetchone()[0] is not None:
+            raise Exception(
+                "evaluations_backup already exists; drop or rename it before migrating again"
+            )
+
+        print("Renaming old evaluations table to evaluations_backup...")
+        cur.execute("ALTER TABLE evaluations RENAME TO evaluations_backup")
+        _rename_backup_relations(cur)
         cur.execute("""
-            SELECT column_name 
-            FROM information_schema.columns 
-            WHERE table_name = 'evaluations' 
-            AND column_name = 'sample_type'
+            CREATE INDEX IF NOT EXISTS idx_evaluations_backup_participant
+            ON evaluations_backup(participant_id, created_at)
         """)
-        
-        if not cur.fetchone():
-            print("Database already using new JSON format or no migration needed.")
-            return
-        
-        print("Old schema detected. Starting migration...")
-        
-        # Get all old evaluations grouped by participant
+
+        print("Creating new evaluations table with JSON format...")
+        cur.execute("""
+            CREATE TABLE evaluations (
+                id SERIAL PRIMARY KEY,
+                participant_id INTEGER REFERENCES participants(id),
+                evaluation_data JSONB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS migration_checkpoints (
+                name VARCHAR(100) PRIMARY KEY,
+                last_participant_id INTEGER NOT NULL DEFAULT 0,
+                participants_migrated BIGINT NOT NULL DEFAULT 0,
+                rows_migrated BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                completed_at TIMESTAMP
+            )
+        """)
+        cur.execute("""
+            INSERT INTO migration_checkpoints (name) VALUES (%s)
+        """, (MIGRATION_NAME,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def migrate_batch(conn, after_participant_id, batch_size):
+    """Migrate the next batch_size participants after after_participant_id.
+
+    Returns (last_participant_id, participants, rows), or None when no
+    participants are left.
+    """
+    cur = conn.cursor()
+    try:
+        # Upper bound of the next participant-id range
+        cur.execute("""
+            SELECT MAX(participant_id) FROM (
+                SELECT DISTINCT participant_id
+                FROM evaluations_backup
+                WHERE participant_id > %s
+                ORDER BY participant_id
+                LIMIT %s
+            ) AS batch
+        """, (after_participant_id, batch_size))
+        last_participant_id = cur.fetchone()[0]
+        if last_participant_id is None:
+            return None
+
         cur.execute("""
-            SELECT 
+            SELECT
                 participant_id,
                 sample_type,
                 sample_index,
@@ -38,89 +149,149 @@ def migrate_to_json_format():
                 model_name,
                 rating,
                 audio_path,
-                original_text
-            FROM evaluations
+                original_text,
+                created_at
+            FROM evaluations_backup
+            WHERE participant_id > %s AND participant_id <= %s
             ORDER BY participant_id, created_at
-        """)
-        
-        old_evaluations = cur.fetchall()
-        
-        if not old_evaluations:
-            print("No data to migrate.")
-            return
-        
-        # Group by participant
-        participant_data = {}
-        for eval_row in old_evaluations:
-            pid = eval_row['participant_id']
-            if pid not in participant_data:
-                participant_data[pid] = {'ratings': []}
-            
-            participant_data[pid]['ratings'].append({
-                'sample_type': eval_row['sample_type'],
-                'sample_index': eval_row['sample_index'],
-                'model_id': eval_row['model_id'],
-                'model_name': eval_row['model_name'],
-                'rating': eval_row['rating'],
-                'audio_path': eval_row['audio_path'],
-                'original_text': eval_row['original_text']
+        """, (after_participant_id, last_participant_id))
+
+        # Group by participant (rows arrive ordered, so one open group at a time)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        participants = 0
+        rows = 0
+        current_id = None
+        ratings = []
+        created_at = None
+
+        def flush_participant():
+            writer.writerow([current_id, json.dumps({'ratings': ratings}), created_at])
+
+        for (pid, sample_type, sample_index, model_id, model_name,
+             rating, audio_path, original_text, row_created_at) in cur:
+            if pid != current_id:
+                if current_id is not None:
+                    flush_participant()
+                    participants += 1
+                current_id = pid
+                ratings = []
+                created_at = row_created_at
+            ratings.append({
+                'sample_type': sample_type,
+                'sample_index': sample_index,
+                'model_id': model_id,
+                'model_name': model_name,
+                'rating': rating,
+                'audio_path': audio_path,
+                'original_text': original_text
             })
-        
-        # Create backup table
-        print("Creating backup table...")
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS evaluations_backup AS 
-            SELECT * FROM evaluations
-        """)
-        
-        # Drop old table
-        print("Dropping old evaluations table...")
-        cur.execute("DROP TABLE evaluations")
-        
-        # Create new table with JSONB
-        print("Creating new evaluations table with JSON format...")
+            rows += 1
+        if current_id is not None:
+            flush_participant()
+            participants += 1
+
+        buffer.seek(0)
+        cur.copy_expert("""
+            COPY evaluations (participant_id, evaluation_data, created_at)
+            FROM STDIN WITH (FORMAT csv)
+        """, buffer)
+
         cur.execute("""
-            CREATE TABLE evaluations (
-                id SERIAL PRIMARY KEY,
-                participant_id INTEGER REFERENCES participants(id),
-                evaluation_data JSONB NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            UPDATE migration_checkpoints SET
+                last_participant_id = %s,
+                participants_migrated = participants_migrated + %s,
+                rows_migrated = rows_migrated + %s,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE name = %s
+        """, (last_participant_id, participants, rows, MIGRATION_NAME))
+        conn.commit()
+        return last_participant_id, participants, rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def migrate_to_json_format(batch_size=None):
+    """Migrate old evaluation format to new JSON format"""
+    batch_size = batch_size or int(os.getenv('MIGRATION_BATCH_SIZE', '500'))
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    try:
+        checkpoint = _checkpoint(cur)
+        if _old_schema_exists(cur):
+            if checkpoint is not None:
+                raise Exception("evaluations has the old schema but a migration checkpoint exists")
+            print("Old schema detected. Starting migration...")
+            prepare_migration(conn)
+            checkpoint = _checkpoint(cur)
+        elif checkpoint is None or checkpoint[3]:
+            print("Database already using new JSON format or no migration needed.")
+            return
+        else:
+            print(f"Resuming migration after participant {checkpoint[0]}...")
+        conn.commit()
+
+        last_participant_id, total_participants, total_rows, _ = checkpoint
+        start = time.perf_counter()
+        migrated_rows = 0
+        while True:
+            result = migrate_batch(conn, last_participant_id, batch_size)
+            if result is None:
+                break
+            last_participant_id, participants, rows = result
+            total_participants += participants
+            total_rows += rows
+            migrated_rows += rows
+            elapsed = time.perf_counter() - start
+            print(
+                f"Migrated {total_participants} participants ({total_rows} rows), "
+                f"up to participant {last_participant_id} - {migrated_rows / elapsed:.0f} rows/s"
             )
-        """)
-        
-        # Insert migrated data
-        print(f"Migrating data for {len(participant_data)} participants...")
-        for participant_id, eval_data in participant_data.items():
-            cur.execute("""
-                INSERT INTO evaluations (participant_id, evaluation_data)
-                VALUES (%s, %s)
-            """, (participant_id, json.dumps(eval_data)))
-        
-        # Create indexes
+
         cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_evaluations_participant 
+            CREATE INDEX IF NOT EXISTS idx_evaluations_participant
             ON evaluations(participant_id)
         """)
-        
+        cur.execute("""
+            UPDATE migration_checkpoints SET completed_at = CURRENT_TIMESTAMP
+            WHERE name = %s
+        """, (MIGRATION_NAME,))
         conn.commit()
+
+        print("Rebuilding rating rollups...")
+        init_database()
+        rebuild_rating_rollups()
+
+        elapsed = time.perf_counter() - start
         print("✅ Migration completed successfully!")
-        print(f"✅ Migrated data for {len(participant_data)} participants")
+        print(f"✅ Migrated data for {total_participants} participants ({total_rows} rows)")
+        if migrated_rows:
+            print(f"⏱️ {migrated_rows} rows in {elapsed:.1f}s ({migrated_rows / elapsed:.0f} rows/s)")
         print("ℹ️ Old data backed up in 'evaluations_backup' table")
-        
+
     except Exception as e:
         conn.rollback()
         print(f"❌ Migration failed: {str(e)}")
+        print("ℹ️ Run the script again to resume from the last completed batch")
         raise
     finally:
         cur.close()
         conn.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate evaluations to the JSON format")
+    parser.add_argument('--batch-size', type=int, help="participants per batch (default MIGRATION_BATCH_SIZE or 500)")
+    parser.add_argument('--yes', action='store_true', help="do not ask for confirmation")
+    args = parser.parse_args()
+
     print("=== Database Migration Script ===")
     print("This will migrate evaluation data from old format to new JSON format.")
-    response = input("Do you want to proceed? (yes/no): ")
-    
+    response = 'yes' if args.yes else input("Do you want to proceed? (yes/no): ")
+
     if response.lower() in ['yes', 'y']:
-        migrate_to_json_format()
+        migrate_to_json_format(args.batch_size)
     else:
         print("Migration cancelled.")
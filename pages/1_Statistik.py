@@ -1,14 +1,82 @@
 import streamlit as st
-from database import get_evaluation_statistics, get_all_participants
-import pandas as pd
+import math
+import os
+from startup import load_env, start_warm_up
+from stats_cache import get_cached_statistics, get_cached_participants_page
+from audio_cache import get_audio_cache_stats
+from export import FORMATS, export_bytes
+from metrics import render_prometheus, snapshot as metrics_snapshot, write_prometheus_file
 
 st.set_page_config(page_title="Statistik Evaluasi - Lagi Bentar", layout="wide")
 
+# Settings below are read from .env; the warm-up thread may not have loaded it yet
+load_env()
+
+# No-op when serve.py already warmed this process
+start_warm_up()
+
+def participants_page_size():
+    """Rows per page of the participant list (keyset-paginated in the database)"""
+    return int(os.getenv('PARTICIPANTS_PAGE_SIZE', '50'))
+
+def next_participants_page(cursor):
+    st.session_state.participant_cursors.append(cursor)
+
+def previous_participants_page():
+    st.session_state.participant_cursors.pop()
+
+@st.fragment
+def participants_table(total):
+    """One page of the participant list; paging reruns only this fragment"""
+    page_size = participants_page_size()
+    cursors = st.session_state.setdefault('participant_cursors', [None])
+    # One extra row tells whether there is a next page
+    participants = get_cached_participants_page(cursors[-1], page_size + 1)
+    has_next = len(participants) > page_size
+    participants = participants[:page_size]
+    
+    if not participants:
+        st.info("Belum ada partisipan yang mengisi form evaluasi.")
+        return
+    
+    import pandas as pd
+    
+    # Names arrive masked (first and last letter) from the database
+    df = pd.DataFrame(participants)
+    df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%d %B %Y, %H:%M:%S')
+    df = df.drop('id', axis=1).rename(columns={
+        'name': 'Nama',
+        'created_at': 'Waktu Submit',
+        'total_evaluations': 'Total Evaluasi'
+    })
+    
+    st.dataframe(
+        df,
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if len(cursors) > 1:
+            st.button("⬅️ Sebelumnya", key="participants_previous",
+                      on_click=previous_participants_page, use_container_width=True)
+    with col2:
+        pages = max(1, math.ceil(total / page_size))
+        st.caption(f"Halaman {len(cursors)} dari {pages}")
+    with col3:
+        if has_next:
+            last = participants[-1]
+            st.button("Selanjutnya ➡️", key="participants_next", on_click=next_participants_page,
+                      args=((last['created_at'], last['id']),), use_container_width=True)
+    
+    st.info(f"📊 Total: {total} partisipan telah mengisi form evaluasi")
+
 st.title("📊 Statistik Evaluasi MOS")
 st.markdown("---")
 
 try:
-    stats = get_evaluation_statistics()
+    stats = get_cached_statistics()
     
     st.subheader("📈 Ringkasan Statistik")
     col1, col2 = st.columns(2)
@@ -38,43 +106,161 @@ try:
     else:
         st.info("Belum ada data evaluasi untuk ditampilkan.")
     
+    # Drill-down views computed from the in-memory ratings cube
+    if stats['model_statistics']:
+        # pandas and the NumPy cube are imported on first use, after the summary renders
+        import pandas as pd
+        from ratings_cube import get_cube, language_summary, model_ids, model_summary, sample_axis, sample_model_means
+        
+        st.markdown("### 🔬 Analisis Detail")
+        cube = get_cube()
+        tab_model, tab_sample, tab_language, tab_significance = st.tabs(
+            ["Per Model", "Per Sampel", "Per Bahasa", "Signifikansi"]
+        )
+        
+        with tab_model:
+            summary = model_summary(cube)
+            st.dataframe(
+                pd.DataFrame([{
+                    'Model': s['model_id'],
+                    'Jumlah Rating': s['count'],
+                    'Rata-rata': s['mean'],
+                    'Std. Deviasi': s['std'],
+                } for s in summary]).round(2),
+                use_container_width=True,
+                hide_index=True
+            )
+            st.markdown("**Distribusi Rating**")
+            st.bar_chart(pd.DataFrame(
+                {f"Model {s['model_id']}": s['histogram'] for s in summary}
+            ))
+        
+        with tab_sample:
+            count, mean, std = sample_model_means(cube)
+            labels = [f"{sample_type.capitalize()} #{index + 1}" for sample_type, index in sample_axis()]
+            models = [f"Model {model_id}" for model_id in model_ids()]
+            st.markdown("**Rata-rata per sampel**")
+            st.dataframe(
+                pd.DataFrame(mean, index=labels, columns=models).round(2),
+                use_container_width=True
+            )
+            st.markdown("**Std. deviasi per sampel**")
+            st.dataframe(
+                pd.DataFrame(std, index=labels, columns=models).where(count > 0).round(2),
+                use_container_width=True
+            )
+        
+        with tab_language:
+            for sample_type, rows in language_summary(cube).items():
+                st.markdown(f"**{sample_type.capitalize()}**")
+                st.dataframe(
+                    pd.DataFrame([{
+                        'Model': r['model_id'],
+                        'Jumlah Rating': r['count'],
+                        'Rata-rata': r['mean'],
+                        'Std. Deviasi': r['std'],
+                    } for r in rows]).round(2),
+                    use_container_width=True,
+                    hide_index=True
+                )
+        
+        with tab_significance:
+            from significance import get_significance
+            result = get_significance()
+            st.markdown("**MOS dengan interval kepercayaan 95%**")
+            st.dataframe(
+                pd.DataFrame([{
+                    'Model': m['model_id'],
+                    'Jumlah Rating': m['count'],
+                    'MOS': m['mos'],
+                    'CI Bawah': m['ci_low'],
+                    'CI Atas': m['ci_high'],
+                } for m in result['models']]).round(3),
+                use_container_width=True,
+                hide_index=True
+            )
+            st.markdown("**Uji berpasangan (pretrained vs fine-tuned)**")
+            st.dataframe(
+                pd.DataFrame([{
+                    'Perbandingan': f"{c['candidate']} vs {c['baseline']}",
+                    'Pasangan Rating': c['pairs'],
+                    'Selisih MOS': c['mean_difference'],
+                    'CI Bawah': c['ci_low'],
+                    'CI Atas': c['ci_high'],
+                    'p-value': c['p_value'],
+                    'p (Holm)': c['p_holm'],
+                    'Signifikan': "Ya" if c['significant'] else "Tidak",
+                } for c in result['comparisons']]).round(4),
+                use_container_width=True,
+                hide_index=True
+            )
+            st.caption(
+                f"Interval dari bootstrap per evaluasi ({result['resamples']:,} resample); "
+                f"p-value dari uji permutasi tanda ({result['permutations']:,} permutasi) atas "
+                f"rating yang dipasangkan per partisipan dan sampel, dikoreksi Holm (α = 0,05). "
+                f"Dihitung dalam {result['seconds']:.2f} detik."
+            )
+    
     # Display participants list
     st.markdown("---")
     st.subheader("👥 Daftar Partisipan")
     
-    participants = get_all_participants()
+    participants_table(stats['total_participants'])
     
-    if participants:
-        # Convert to DataFrame for better display
-        df = pd.DataFrame(participants)
-        df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%d %B %Y, %H:%M:%S')
-        
-        # Sensor participant names (show first and last letter, mask the rest)
-        def sensor_name(name):
-            if len(name) <= 2:
-                return name[0] + '*' * (len(name) - 1)
-            return name[0] + '*' * (len(name) - 2) + name[-1]
-        
-        df['name'] = df['name'].apply(sensor_name)
-        
-        # Drop email column and rename others
-        df = df.drop('email', axis=1).drop('id', axis=1)
-        df = df.rename(columns={
-            'id': 'ID',
-            'name': 'Nama',
-            'created_at': 'Waktu Submit',
-            'total_evaluations': 'Total Evaluasi'
-        })
-        
-        st.dataframe(
-            df,
-            use_container_width=True,
-            hide_index=True
+    # Bulk export, generated only when the download button is clicked
+    if stats['total_evaluations']:
+        st.markdown("---")
+        st.subheader("📥 Ekspor Data Rating")
+        st.caption("Satu baris per rating, tanpa nama dan email partisipan.")
+        export_format = st.radio("Format:", sorted(FORMATS), horizontal=True, key="export_format")
+        st.download_button(
+            f"⬇️ Download {export_format.upper()}",
+            data=lambda fmt=export_format: export_bytes(fmt),
+            file_name=f"mos_ratings.{export_format}",
+            mime=FORMATS[export_format],
+            on_click="ignore"
         )
-        
-        st.info(f"📊 Total: {len(participants)} partisipan telah mengisi form evaluasi")
-    else:
-        st.info("Belum ada partisipan yang mengisi form evaluasi.")
             
 except Exception as e:
     st.error(f"Error mengambil statistik: {str(e)}")
+
+# Admin-only performance metrics (enabled by setting ADMIN_TOKEN)
+admin_token = os.getenv('ADMIN_TOKEN')
+if admin_token:
+    with st.expander("🔒 Admin: Metrik Performa"):
+        token = st.text_input("Admin token:", type="password", key="admin_token")
+        if token == admin_token:
+            import pandas as pd
+            
+            data = metrics_snapshot()
+            
+            st.markdown("#### ⏱️ Waktu Operasi")
+            if data['operations']:
+                st.dataframe(
+                    pd.DataFrame.from_dict(data['operations'], orient='index').round(2),
+                    use_container_width=True
+                )
+            else:
+                st.info("Belum ada data metrik.")
+            
+            audio_stats = get_audio_cache_stats()
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Audio cache hit / miss", f"{audio_stats['hits']} / {audio_stats['misses']}")
+            with col2:
+                st.metric("File di cache", f"{audio_stats['entries']} / {audio_stats['indexed_files']}")
+            with col3:
+                st.metric("Memori cache", f"{audio_stats['bytes'] / 1e6:.1f} / {audio_stats['max_bytes'] / 1e6:.0f} MB")
+            
+            st.markdown("#### 📟 Counter & Gauge")
+            st.json({'counters': data['counters'], 'gauges': data['gauges']})
+            
+            prometheus_text = render_prometheus()
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("⬇️ Download Prometheus", prometheus_text, file_name="mos_metrics.prom", mime="text/plain")
+            with col2:
+                if st.button("💾 Tulis file Prometheus"):
+                    st.success(f"Metrik ditulis ke {write_prometheus_file()}")
+        elif token:
+            st.error("Token salah.")
@@ -0,0 +1,177 @@
+"""
+In-memory ratings cube for the statistics page.
+
+All ratings are held in one NumPy array of shape
+(evaluations, samples, models), where 0 marks a missing rating. The cube is
+loaded in bulk on first use and afterwards only evaluations not loaded yet
+are fetched, whenever the statistics cache is invalidated (or at most every
+STATS_CACHE_TTL seconds). Concurrent submits can commit a lower evaluation id
+after a higher one, so each refresh looks back CUBE_RESCAN_IDS ids below the
+highest id loaded and picks up whichever of them are still missing. Per-model, per-sample and
+per-language aggregates are computed from it with vectorized operations, so
+drill-down views need no further database queries.
+"""
+
+import os
+import threading
+import time
+import numpy as np
+from dataset_index import LANGUAGES, MODEL_REGISTRY, load_dataset_index
+from metrics import register_collector, timer
+from stats_cache import on_invalidate
+from storage import get_rating_rows
+
+RATING_VALUES = np.arange(1, 6)
+
+_lock = threading.Lock()
+_state = {
+    'ratings': None,
+    'rows': 0,
+    'last_evaluation_id': 0,
+    'evaluation_ids': {},
+    'participant_ids': [],
+    'loaded_at': 0.0,
+    'stale': True,
+}
+
+def model_ids():
+    """Model axis labels (A-F)"""
+    return [model.model_id for language in LANGUAGES for model in MODEL_REGISTRY[language.sample_type]]
+
+def sample_axis():
+    """Sample axis labels as (sample_type, sample_index) pairs"""
+    return [(sample.sample_type, sample.index) for _, sample in load_dataset_index().iter_samples()]
+
+def _mark_stale():
+    _state['stale'] = True
+
+def _grow(ratings, rows_needed):
+    """Return ratings with capacity for rows_needed rows (amortized doubling)"""
+    if ratings.shape[0] >= rows_needed:
+        return ratings
+    capacity = max(rows_needed, ratings.shape[0] * 2, 64)
+    grown = np.zeros((capacity,) + ratings.shape[1:], dtype=np.int8)
+    grown[:ratings.shape[0]] = ratings
+    return grown
+
+def refresh():
+    """Append evaluations newer than the last one loaded"""
+    samples = {key: pos for pos, key in enumerate(sample_axis())}
+    models = {model_id: pos for pos, model_id in enumerate(model_ids())}
+
+    with _lock:
+        if _state['ratings'] is None:
+            _state['ratings'] = np.zeros((0, len(samples), len(models)), dtype=np.int8)
+        _state['stale'] = False
+        evaluation_ids = _state['evaluation_ids']
+        # Ids below the watermark may still be committed late
+        after = max(0, _state['last_evaluation_id'] - int(os.getenv('CUBE_RESCAN_IDS', '1000')))
+        known_ids = [evaluation_id for evaluation_id in evaluation_ids if evaluation_id > after]
+        with timer('cube.refresh'):
+            rows = get_rating_rows(after, known_ids)
+        if not rows:
+            _state['loaded_at'] = time.monotonic()
+            return 0
+
+        ev_pos, sample_pos, model_pos, values = [], [], [], []
+        for evaluation_id, participant_id, sample_type, sample_index, model_id, rating in rows:
+            s = samples.get((sample_type, sample_index))
+            m = models.get(model_id)
+            if s is None or m is None or not 1 <= rating <= 5:
+                continue
+            if evaluation_id not in evaluation_ids:
+                evaluation_ids[evaluation_id] = len(evaluation_ids)
+                _state['participant_ids'].append(participant_id)
+            ev_pos.append(evaluation_ids[evaluation_id])
+            sample_pos.append(s)
+            model_pos.append(m)
+            values.append(rating)
+
+        ratings = _grow(_state['ratings'], len(evaluation_ids))
+        ratings[ev_pos, sample_pos, model_pos] = values
+        _state['ratings'] = ratings
+        _state['rows'] = len(evaluation_ids)
+        _state['last_evaluation_id'] = max(_state['last_evaluation_id'], max(row[0] for row in rows))
+        _state['loaded_at'] = time.monotonic()
+        return len(rows)
+
+def get_cube_snapshot():
+    """Return (cube, last loaded evaluation id), refreshed if stale.
+
+    A late-committed evaluation adds a row without moving the id, so callers
+    caching on the snapshot key on both."""
+    ttl = float(os.getenv('STATS_CACHE_TTL', '60'))
+    if _state['stale'] or time.monotonic() - _state['loaded_at'] > ttl:
+        refresh()
+    with _lock:
+        return _state['ratings'][:_state['rows']], _state['last_evaluation_id']
+
+def get_cube():
+    """Return the (evaluations, samples, models) rating array, refreshed if stale"""
+    return get_cube_snapshot()[0]
+
+def _masked_stats(ratings, axis):
+    """Count, mean and sample standard deviation over axis, ignoring zeros"""
+    mask = ratings > 0
+    values = ratings.astype(np.float64)
+    count = mask.sum(axis=axis)
+    total = values.sum(axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        deviation = np.where(mask, values - np.expand_dims(mean, axis), 0.0)
+        std = np.sqrt((deviation ** 2).sum(axis=axis) / (count - 1))
+    std = np.where(count > 1, std, 0.0)
+    return count, mean, std
+
+def model_summary(cube=None):
+    """Per-model count, mean, std and rating histogram"""
+    cube = get_cube() if cube is None else cube
+    flat = cube.transpose(2, 0, 1).reshape(cube.shape[2], -1)
+    count, mean, std = _masked_stats(flat, 1)
+    histogram = (flat[:, :, None] == RATING_VALUES).sum(axis=1)
+    return [{
+        'model_id': model_id,
+        'count': int(count[m]),
+        'mean': float(mean[m]) if count[m] else None,
+        'std': float(std[m]),
+        'histogram': {int(v): int(n) for v, n in zip(RATING_VALUES, histogram[m])},
+    } for m, model_id in enumerate(model_ids())]
+
+def sample_model_means(cube=None):
+    """(samples, models) arrays of count, mean and std across evaluations"""
+    cube = get_cube() if cube is None else cube
+    return _masked_stats(cube, 0)
+
+def language_summary(cube=None):
+    """Per-language, per-model count, mean and std"""
+    cube = get_cube() if cube is None else cube
+    axis = sample_axis()
+    ids = model_ids()
+    summary = {}
+    for language in LANGUAGES:
+        sample_mask = np.array([sample_type == language.sample_type for sample_type, _ in axis])
+        model_pos = [ids.index(model.model_id) for model in MODEL_REGISTRY[language.sample_type]]
+        subset = cube[:, sample_mask][:, :, model_pos]
+        flat = subset.transpose(2, 0, 1).reshape(len(model_pos), -1)
+        count, mean, std = _masked_stats(flat, 1)
+        summary[language.sample_type] = [{
+            'model_id': ids[pos],
+            'count': int(count[i]),
+            'mean': float(mean[i]) if count[i] else None,
+            'std': float(std[i]),
+        } for i, pos in enumerate(model_pos)]
+    return summary
+
+def get_cube_stats():
+    """Size and freshness of the cube"""
+    with _lock:
+        ratings = _state['ratings']
+        return {
+            'evaluations': _state['rows'],
+            'last_evaluation_id': _state['last_evaluation_id'],
+            'bytes': int(ratings.nbytes) if ratings is not None else 0,
+            'stale': _state['stale'],
+        }
+
+on_invalidate(_mark_stale)
+register_collector('ratings_cube', get_cube_stats)
@@ -0,0 +1,60 @@
+"""
+Balanced assignment of samples to participants.
+
+With SAMPLES_PER_PARTICIPANT set, each session rates only that many samples
+(every model of a chosen sample is rated) instead of the whole dataset. Each
+language gets at least its proportional share of the subset, and the samples
+assigned least often so far (then the ones with the fewest ratings) are
+picked first, including for the slots left over after rounding.
+
+The subsets approximate a balanced incomplete block design: an exact BIBD
+only exists for some (pool size, k) combinations and cannot honour the
+language quotas, so each block is built greedily instead. Per-sample
+assignment counts stay within one of each other, and among equally assigned
+samples the one that shared the fewest sessions with the samples already
+picked goes first (pair counts in assignment_pairs), which keeps the pair
+counts close together but, unlike a true BIBD, not necessarily equal.
+Assignment happens atomically in storage.assign_samples, so coverage stays even under
+concurrent arrivals, and is keyed by the session's draft token so a reload
+keeps the same subset.
+"""
+
+import os
+import streamlit as st
+from drafts import draft_token
+from storage import assign_samples
+
+def samples_per_participant():
+    """Configured subset size (0 = every sample)"""
+    return int(os.getenv('SAMPLES_PER_PARTICIPANT', '0'))
+
+def language_quotas(pool_sizes, k):
+    """Minimum samples per language, proportional to pool size (rounded down)"""
+    total = sum(pool_sizes.values())
+    return {sample_type: k * size // total for sample_type, size in pool_sizes.items()}
+
+def session_samples(dataset_index):
+    """(language, sample) pairs this session rates, in form order"""
+    samples = dataset_index.iter_samples()
+    k = samples_per_participant()
+    if k <= 0 or k >= len(samples):
+        return samples
+
+    if 'assigned_samples' not in st.session_state:
+        pool = [(sample.sample_type, sample.index) for _, sample in samples]
+        pool_sizes = {}
+        for sample_type, _ in pool:
+            pool_sizes[sample_type] = pool_sizes.get(sample_type, 0) + 1
+        try:
+            assigned = assign_samples(draft_token(), pool, k, language_quotas(pool_sizes, k))
+        except Exception as e:
+            # Better a long form than no form
+            print(f"Sample assignment failed, showing every sample: {str(e)}")
+            return samples
+        st.session_state.assigned_samples = frozenset(tuple(sample) for sample in assigned)
+
+    assigned = st.session_state.assigned_samples
+    return tuple(
+        (language, sample) for language, sample in samples
+        if (sample.sample_type, sample.index) in assigned
+    )
@@ -0,0 +1,35 @@
+"""
+Start the evaluation app on a warm process.
+
+Runs startup.warm_up() (dataset index, database connection and migrations,
+audio and statistics caches, deferred imports) and only then starts the
+Streamlit server in the same process, so the first participant after a
+deploy or restart gets a ready form. Warm-up and server start timings are
+printed; they are also reported as startup_* gauges on the admin metrics
+panel. Extra arguments are passed on to `streamlit run`.
+
+Usage:
+    python serve.py [--server.port 8501 --server.address 0.0.0.0 ...]
+"""
+
+import os
+import sys
+import time
+from startup import warm_up
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(ROOT, 'main.py')
+
+def main():
+    # The dataset and audio paths are relative to the repository
+    os.chdir(ROOT)
+    start = time.perf_counter()
+    warm_up()
+    print(f"Process ready in {time.perf_counter() - start:.2f}s, starting Streamlit")
+
+    from streamlit.web import cli as stcli
+    sys.argv = ['streamlit', 'run', APP_PATH] + sys.argv[1:]
+    return stcli.main()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+Confidence intervals and pairwise significance tests for the model MOS.
+
+Computed from the ratings cube (see ratings_cube.py), treating each
+evaluation (one participant's submission) as a cluster, since ratings by the
+same participant are correlated:
+
+- MOS per model with a 95% percentile bootstrap interval, resampling
+  evaluations with replacement BOOTSTRAP_RESAMPLES times (default 10000)
+- for each pair in dataset_index.MODEL_PAIRS, the mean paired difference
+  (candidate - baseline) over ratings matched by evaluation and sample, with a
+  bootstrap interval and a two-sided sign-flip permutation test
+  (PERMUTATION_RESAMPLES, default 10000): under the null hypothesis the sign
+  of each participant's summed difference is arbitrary. p-values are also
+  Holm-adjusted across the pairs.
+
+Every resample is a weight vector over evaluations, so the statistics of all
+models and pairs come from one matrix product per chunk of resamples. The
+random generator is seeded, so a given set of ratings always gives the same
+result; results are cached by dataset version, last evaluation id and the
+number of evaluations loaded.
+"""
+
+import os
+import threading
+import time
+import warnings
+import numpy as np
+from dataset_index import MODEL_PAIRS, load_dataset_index
+from metrics import timer
+from ratings_cube import get_cube_snapshot, model_ids
+
+SEED = 7245
+CONFIDENCE = 0.95
+ALPHA = 0.05
+
+# Upper bound on resample weights held in memory at once (elements)
+CHUNK_ELEMENTS = 4_000_000
+
+_lock = threading.Lock()
+_cache = {}
+
+def _resamples():
+    return int(os.getenv('BOOTSTRAP_RESAMPLES', '10000'))
+
+def _permutations():
+    return int(os.getenv('PERMUTATION_RESAMPLES', '10000'))
+
+def _chunks(total, n):
+    """Sizes of the resample chunks for n evaluations"""
+    size = max(1, CHUNK_ELEMENTS // max(n, 1))
+    for start in range(0, total, size):
+        yield min(size, total - start)
+
+def bootstrap_weights(rng, chunk, n):
+    """(chunk, n) counts of each evaluation in chunk resamples with replacement"""
+    picks = rng.integers(0, n, size=(chunk, n)) + (np.arange(chunk) * n)[:, None]
+    return np.bincount(picks.ravel(), minlength=chunk * n).reshape(chunk, n).astype(np.float32)
+
+def bootstrap_ratios(numerators, denominators, resamples, rng):
+    """(resamples, k) bootstrap replicates of the column ratios sum(num) / sum(den)"""
+    n = numerators.shape[0]
+    columns = np.hstack([numerators, denominators]).astype(np.float32)
+    k = numerators.shape[1]
+    replicates = []
+    for chunk in _chunks(resamples, n):
+        totals = bootstrap_weights(rng, chunk, n) @ columns
+        with np.errstate(invalid='ignore', divide='ignore'):
+            replicates.append(totals[:, :k] / totals[:, k:])
+    return np.vstack(replicates) if replicates else np.zeros((0, k))
+
+def sign_flip_pvalues(differences, permutations, rng):
+    """Two-sided p-values of sum(differences[:, j]) under random sign flips per row"""
+    n, k = differences.shape
+    observed = np.abs(differences.sum(axis=0))
+    # Tolerance so ties with the observed statistic count as extreme
+    threshold = observed - 1e-9 * np.maximum(observed, 1.0)
+    columns = differences.astype(np.float64)
+    extreme = np.zeros(k, dtype=np.int64)
+    for chunk in _chunks(permutations, n):
+        signs = rng.integers(0, 2, size=(chunk, n)).astype(np.float64) * 2 - 1
+        extreme += (np.abs(signs @ columns) >= threshold).sum(axis=0)
+    return (extreme + 1) / (permutations + 1)
+
+def holm(p_values):
+    """Holm-Bonferroni adjusted p-values"""
+    p_values = np.asarray(p_values, dtype=np.float64)
+    order = np.argsort(p_values)
+    m = len(p_values)
+    adjusted = np.empty(m)
+    running = 0.0
+    for rank, i in enumerate(order):
+        running = max(running, (m - rank) * p_values[i])
+        adjusted[i] = min(running, 1.0)
+    return adjusted
+
+def _interval(replicates):
+    tail = (1 - CONFIDENCE) / 2 * 100
+    # Columns without ratings are all NaN; their interval is reported as None
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanpercentile(replicates, [tail, 100 - tail], axis=0)
+
+def compute(cube, resamples=None, permutations=None):
+    """MOS intervals per model and paired comparisons for a ratings cube"""
+    resamples = resamples or _resamples()
+    permutations = permutations or _permutations()
+    rng = np.random.default_rng(SEED)
+    ids = model_ids()
+    ratings = cube.astype(np.float32)
+    rated = cube > 0
+
+    # Per-evaluation rating sums and counts for every model
+    sums = ratings.sum(axis=1)
+    counts = rated.sum(axis=1).astype(np.float32)
+
+    # Per-evaluation paired difference sums and pair counts for every pair
+    pairs = [(ids.index(a), ids.index(b)) for a, b in MODEL_PAIRS if a in ids and b in ids]
+    differences = np.zeros((cube.shape[0], len(pairs)), dtype=np.float32)
+    matched = np.zeros((cube.shape[0], len(pairs)), dtype=np.float32)
+    for j, (a, b) in enumerate(pairs):
+        both = rated[:, :, a] & rated[:, :, b]
+        differences[:, j] = np.where(both, ratings[:, :, b] - ratings[:, :, a], 0).sum(axis=1)
+        matched[:, j] = both.sum(axis=1)
+
+    replicates = bootstrap_ratios(
+        np.hstack([sums, differences]), np.hstack([counts, matched]), resamples, rng
+    )
+    low, high = _interval(replicates)
+
+    models = []
+    for m, model_id in enumerate(ids):
+        n = int(counts[:, m].sum())
+        models.append({
+            'model_id': model_id,
+            'count': n,
+            'mos': float(sums[:, m].sum() / n) if n else None,
+            'ci_low': float(low[m]) if n else None,
+            'ci_high': float(high[m]) if n else None,
+        })
+
+    p_values = sign_flip_pvalues(differences, permutations, rng) if len(pairs) else np.zeros(0)
+    p_holm = holm(p_values)
+    comparisons = []
+    for j, (a, b) in enumerate(pairs):
+        n = int(matched[:, j].sum())
+        column = len(ids) + j
+        comparisons.append({
+            'baseline': ids[a],
+            'candidate': ids[b],
+            'pairs': n,
+            'evaluations': int((matched[:, j] > 0).sum()),
+            'mean_difference': float(differences[:, j].sum() / n) if n else None,
+            'ci_low': float(low[column]) if n else None,
+            'ci_high': float(high[column]) if n else None,
+            'p_value': float(p_values[j]) if n else None,
+            'p_holm': float(p_holm[j]) if n else None,
+            'significant': bool(n and p_holm[j] < ALPHA),
+        })
+
+    return {
+        'evaluations': int(cube.shape[0]),
+        'resamples': resamples,
+        'permutations': permutations,
+        'models': models,
+        'comparisons': comparisons,
+    }
+
+def get_significance():
+    """compute() on the current cube, cached until the dataset or the cube changes"""
+    cube, last_evaluation_id = get_cube_snapshot()
+    # Row count too: late commits below the last id add rows without moving it
+    key = (load_dataset_index().version, last_evaluation_id, cube.shape[0], _resamples(), _permutations())
+    with _lock:
+        if key in _cache:
+            return _cache[key]
+
+    start = time.perf_counter()
+    with timer('stats.significance'):
+        result = compute(cube)
+    result['seconds'] = time.perf_counter() - start
+
+    with _lock:
+        # Only the latest data is ever asked for again
+        _cache.clear()
+        _cache[key] = result
+    return result
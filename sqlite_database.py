@@ -0,0 +1,676 @@
+"""
+Embedded SQLite storage backend.
+
+Implements the same functions as database.py on a local SQLite file in WAL
+mode (SQLITE_PATH, default mos_evaluation.sqlite3). Ratings are also written
+to a normalized ratings table and to rating_rollups, so statistics never have
+to parse the JSON payloads. Payloads are stored compactly against
+dataset_manifests like in Postgres (see dataset_index.py). Intended for tests, demos, CI benchmarks and
+single-node deployments; select it with STORAGE_BACKEND=sqlite.
+"""
+
+import json
+import math
+import os
+import random
+import sqlite3
+import threading
+from datetime import datetime
+from dataset_index import (
+    EVALUATION_FORMAT, block_pairs, compact_evaluation, draft_rating, expand_evaluation,
+    is_compact, load_manifest, pick_samples,
+)
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+_manifests = {}
+
+def _db_path():
+    return os.getenv('SQLITE_PATH', 'mos_evaluation.sqlite3')
+
+def get_db_connection():
+    """Return this thread's connection, creating the schema on first use"""
+    path = _db_path()
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'path', None) != path:
+        try:
+            conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        except Exception as e:
+            raise Exception(f"Database connection error: {str(e)}")
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        _local.conn = conn
+        _local.path = path
+        with _schema_lock:
+            if path not in _schema_ready:
+                _create_schema(conn)
+                _schema_ready.add(path)
+    return conn
+
+def _create_schema(conn):
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS participants (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            submission_key TEXT UNIQUE
+        );
+        CREATE INDEX IF NOT EXISTS idx_participants_email ON participants(email);
+        CREATE INDEX IF NOT EXISTS idx_participants_created_at_id ON participants(created_at, id);
+
+        CREATE TABLE IF NOT EXISTS evaluations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            participant_id INTEGER REFERENCES participants(id),
+            evaluation_data TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_evaluations_participant ON evaluations(participant_id);
+        CREATE INDEX IF NOT EXISTS idx_evaluations_created_at_id ON evaluations(created_at, id);
+
+        CREATE TABLE IF NOT EXISTS ratings (
+            evaluation_id INTEGER NOT NULL REFERENCES evaluations(id),
+            participant_id INTEGER NOT NULL,
+            sample_type TEXT NOT NULL,
+            sample_index INTEGER NOT NULL,
+            model_id TEXT NOT NULL,
+            model_name TEXT,
+            rating INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_ratings_evaluation ON ratings(evaluation_id);
+
+        CREATE TABLE IF NOT EXISTS rating_rollups (
+            model_id TEXT NOT NULL,
+            sample_type TEXT NOT NULL,
+            sample_index INTEGER NOT NULL,
+            model_name TEXT,
+            rating_count INTEGER NOT NULL DEFAULT 0,
+            rating_sum INTEGER NOT NULL DEFAULT 0,
+            rating_sum_sq INTEGER NOT NULL DEFAULT 0,
+            rating_min INTEGER,
+            rating_max INTEGER,
+            PRIMARY KEY (model_id, sample_type, sample_index)
+        );
+
+        CREATE TABLE IF NOT EXISTS assignment_counts (
+            sample_type TEXT NOT NULL,
+            sample_index INTEGER NOT NULL,
+            assigned_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (sample_type, sample_index)
+        );
+
+        CREATE TABLE IF NOT EXISTS assignment_pairs (
+            first_type TEXT NOT NULL,
+            first_index INTEGER NOT NULL,
+            second_type TEXT NOT NULL,
+            second_index INTEGER NOT NULL,
+            pair_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (first_type, first_index, second_type, second_index)
+        );
+
+        CREATE TABLE IF NOT EXISTS sample_assignments (
+            token TEXT PRIMARY KEY,
+            samples TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS dataset_manifests (
+            version TEXT NOT NULL,
+            slot INTEGER NOT NULL,
+            rating_key TEXT NOT NULL,
+            sample_type TEXT NOT NULL,
+            sample_index INTEGER NOT NULL,
+            model_id TEXT NOT NULL,
+            model_name TEXT,
+            audio_path TEXT,
+            original_text TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (version, slot)
+        );
+
+        CREATE TABLE IF NOT EXISTS drafts (
+            token TEXT PRIMARY KEY,
+            name TEXT,
+            email TEXT,
+            ratings TEXT NOT NULL DEFAULT '{}',
+            participant_id INTEGER REFERENCES participants(id),
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            submitted_at TIMESTAMP
+        );
+    """)
+
+def init_database():
+    """Initialize database tables"""
+    try:
+        get_db_connection()
+        print("Database tables created successfully!")
+    except Exception as e:
+        raise Exception(f"Error initializing database: {str(e)}")
+
+def _manifest_slots(conn, version):
+    """Manifest slots of a dataset version, stored on first use"""
+    key = (_db_path(), version)
+    if key in _manifests:
+        return _manifests[key]
+    rows = conn.execute("""
+        SELECT rating_key, sample_type, sample_index, model_id, model_name, audio_path, original_text
+        FROM dataset_manifests
+        WHERE version = ?
+        ORDER BY slot
+    """, (version,)).fetchall()
+    if rows:
+        _manifests[key] = [dict(row) for row in rows]
+        return _manifests[key]
+    # Inserted in the caller's transaction, so only cached once read back
+    slots = load_manifest(version)
+    conn.executemany("""
+        INSERT OR IGNORE INTO dataset_manifests (
+            version, slot, rating_key, sample_type, sample_index,
+            model_id, model_name, audio_path, original_text
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [(
+        version, position, slot['rating_key'], slot['sample_type'], slot['sample_index'],
+        slot['model_id'], slot['model_name'], slot['audio_path'], slot['original_text'],
+    ) for position, slot in enumerate(slots, 1)])
+    return slots
+
+def _expand(conn, evaluation_data):
+    """Full rating entries of a stored payload"""
+    slots = _manifest_slots(conn, evaluation_data['manifest']) if is_compact(evaluation_data) else None
+    return expand_evaluation(evaluation_data, slots)
+
+def _insert_evaluation(conn, participant_id, evaluation_data):
+    """Insert one evaluation with its normalized ratings and rollups"""
+    cur = conn.execute(
+        "INSERT INTO evaluations (participant_id, evaluation_data) VALUES (?, ?)",
+        (participant_id, json.dumps(evaluation_data, separators=(',', ':')))
+    )
+    evaluation_id = cur.lastrowid
+    rows = [(
+        evaluation_id,
+        participant_id,
+        r['sample_type'],
+        int(r['sample_index']),
+        r['model_id'],
+        r.get('model_name'),
+        int(r['rating']),
+    ) for r in _expand(conn, evaluation_data)]
+    conn.executemany("""
+        INSERT INTO ratings
+        (evaluation_id, participant_id, sample_type, sample_index, model_id, model_name, rating)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.executemany("""
+        INSERT INTO rating_rollups (
+            model_id, sample_type, sample_index, model_name,
+            rating_count, rating_sum, rating_sum_sq, rating_min, rating_max
+        )
+        VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?)
+        ON CONFLICT (model_id, sample_type, sample_index) DO UPDATE SET
+            model_name = excluded.model_name,
+            rating_count = rating_count + 1,
+            rating_sum = rating_sum + excluded.rating_sum,
+            rating_sum_sq = rating_sum_sq + excluded.rating_sum_sq,
+            rating_min = MIN(rating_min, excluded.rating_min),
+            rating_max = MAX(rating_max, excluded.rating_max)
+    """, [(m, t, i, n, r, r * r, r, r) for _, _, t, i, m, n, r in rows])
+    return evaluation_id
+
+def save_participant(name, email):
+    """Save participant and return participant ID"""
+    conn = get_db_connection()
+    try:
+        cur = conn.execute("INSERT INTO participants (name, email) VALUES (?, ?)", (name, email))
+        return cur.lastrowid
+    except Exception as e:
+        raise Exception(f"Error saving participant: {str(e)}")
+
+def save_evaluation(participant_id, evaluation_data):
+    """Save evaluation data as JSON"""
+    conn = get_db_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        _insert_evaluation(conn, participant_id, evaluation_data)
+        conn.execute("COMMIT")
+    except Exception as e:
+        conn.execute("ROLLBACK")
+        raise Exception(f"Error saving evaluation: {str(e)}")
+
+def submit_evaluation(name, email, evaluation_data, allow_duplicate=False):
+    """Save participant and evaluation atomically.
+
+    Returns a tuple (participant_id, duplicate), see database.submit_evaluation.
+    """
+    conn = get_db_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        duplicate = conn.execute(
+            "SELECT 1 FROM participants WHERE email = ? LIMIT 1", (email,)
+        ).fetchone() is not None
+        participant_id = None
+        if allow_duplicate or not duplicate:
+            participant_id = conn.execute(
+                "INSERT INTO participants (name, email) VALUES (?, ?)", (name, email)
+            ).lastrowid
+            _insert_evaluation(conn, participant_id, evaluation_data)
+        conn.execute("COMMIT")
+        return participant_id, duplicate
+    except Exception as e:
+        conn.execute("ROLLBACK")
+        raise Exception(f"Error saving evaluation: {str(e)}")
+
+def _merge_draft(conn, token, name, email, changed_ratings):
+    conn.execute("""
+        INSERT INTO drafts (token, name, email, ratings)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (token) DO UPDATE SET
+            name = excluded.name,
+            email = excluded.email,
+            ratings = json_patch(drafts.ratings, excluded.ratings),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE drafts.submitted_at IS NULL
+    """, (token, name, email, json.dumps(changed_ratings)))
+
+def save_draft(token, name, email, changed_ratings):
+    """Merge changed ratings (rating key -> rating) into a draft"""
+    conn = get_db_connection()
+    try:
+        _merge_draft(conn, token, name, email, changed_ratings)
+    except Exception as e:
+        raise Exception(f"Error saving draft: {str(e)}")
+
+def get_draft(token):
+    """Return a draft as a dict (name, email, ratings, submitted) or None"""
+    conn = get_db_connection()
+    try:
+        row = conn.execute("""
+            SELECT name, email, ratings, submitted_at IS NOT NULL AS submitted
+            FROM drafts
+            WHERE token = ?
+        """, (token,)).fetchone()
+        if row is None:
+            return None
+        return dict(row, ratings=json.loads(row['ratings']), submitted=bool(row['submitted']))
+    except Exception as e:
+        raise Exception(f"Error retrieving draft: {str(e)}")
+
+def promote_draft(token, name, email, changed_ratings, manifest_version, allow_duplicate=False):
+    """Submit a draft in place, see database.promote_draft"""
+    conn = get_db_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        _merge_draft(conn, token, name, email, changed_ratings)
+        draft = conn.execute(
+            "SELECT ratings, participant_id, submitted_at FROM drafts WHERE token = ?", (token,)
+        ).fetchone()
+        if draft['submitted_at'] is not None:
+            conn.execute("COMMIT")
+            return draft['participant_id'], False
+
+        duplicate = conn.execute(
+            "SELECT 1 FROM participants WHERE email = ? LIMIT 1", (email,)
+        ).fetchone() is not None
+        participant_id = None
+        if allow_duplicate or not duplicate:
+            participant_id = conn.execute(
+                "INSERT INTO participants (name, email) VALUES (?, ?)", (name, email)
+            ).lastrowid
+            ratings = json.loads(draft['ratings'])
+            _insert_evaluation(conn, participant_id, {
+                'v': EVALUATION_FORMAT,
+                'manifest': manifest_version,
+                'r': [
+                    int(draft_rating(ratings.get(slot['rating_key'], 0)))
+                    for slot in _manifest_slots(conn, manifest_version)
+                ],
+            })
+            conn.execute("""
+                UPDATE drafts SET participant_id = ?, submitted_at = CURRENT_TIMESTAMP
+                WHERE token = ?
+            """, (participant_id, token))
+        conn.execute("COMMIT")
+        return participant_id, duplicate
+    except Exception as e:
+        conn.execute("ROLLBACK")
+        raise Exception(f"Error submitting draft: {str(e)}")
+
+def submit_evaluations_batch(submissions):
+    """Write queued submissions, skipping already written keys"""
+    if not submissions:
+        return 0
+
+    conn = get_db_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        inserted = 0
+        for submission in submissions:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO participants (name, email, submission_key) VALUES (?, ?, ?)",
+                (submission['name'], submission['email'], submission['submission_key'])
+            )
+            if cur.rowcount:
+                _insert_evaluation(conn, cur.lastrowid, submission['evaluation_data'])
+                inserted += 1
+        conn.execute("COMMIT")
+        return inserted
+    except Exception as e:
+        conn.execute("ROLLBACK")
+        raise Exception(f"Error saving evaluation batch: {str(e)}")
+
+def assign_samples(token, pool, count, quotas):
+    """Pick the least-covered samples of pool, see database.assign_samples"""
+    conn = get_db_connection()
+    try:
+        # BEGIN IMMEDIATE takes the write lock, so assignments are serialized
+        conn.execute("BEGIN IMMEDIATE")
+        existing = conn.execute(
+            "SELECT samples FROM sample_assignments WHERE token = ?", (token,)
+        ).fetchone()
+        if existing:
+            conn.execute("COMMIT")
+            return [tuple(sample) for sample in json.loads(existing['samples'])]
+
+        assigned = {
+            (row['sample_type'], row['sample_index']): row['assigned_count']
+            for row in conn.execute("SELECT * FROM assignment_counts")
+        }
+        rated = {
+            (row['sample_type'], row['sample_index']): row['rated']
+            for row in conn.execute("""
+                SELECT sample_type, sample_index, MIN(rating_count) AS rated
+                FROM rating_rollups
+                GROUP BY sample_type, sample_index
+            """)
+        }
+        pair_counts = {
+            ((row['first_type'], row['first_index']), (row['second_type'], row['second_index'])): row['pair_count']
+            for row in conn.execute("SELECT * FROM assignment_pairs")
+        }
+        order = sorted(
+            (tuple(sample) for sample in pool),
+            key=lambda sample: (assigned.get(sample, 0), rated.get(sample, 0), random.random())
+        )
+
+        samples = pick_samples(
+            [(sample, assigned.get(sample, 0)) for sample in order], count, quotas, pair_counts
+        )
+
+        conn.executemany("""
+            INSERT INTO assignment_counts (sample_type, sample_index, assigned_count)
+            VALUES (?, ?, 1)
+            ON CONFLICT (sample_type, sample_index) DO UPDATE SET
+                assigned_count = assigned_count + 1
+        """, samples)
+        conn.executemany("""
+            INSERT INTO assignment_pairs (first_type, first_index, second_type, second_index, pair_count)
+            VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT (first_type, first_index, second_type, second_index) DO UPDATE SET
+                pair_count = pair_count + 1
+        """, [first + second for first, second in block_pairs(samples)])
+        conn.execute(
+            "INSERT INTO sample_assignments (token, samples) VALUES (?, ?)",
+            (token, json.dumps(samples))
+        )
+        conn.execute("COMMIT")
+        return samples
+    except Exception as e:
+        conn.execute("ROLLBACK")
+        raise Exception(f"Error assigning samples: {str(e)}")
+
+def get_all_evaluations():
+    """Retrieve all evaluations with participant information (full rating entries)"""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("""
+            SELECT
+                e.id,
+                p.name as participant_name,
+                p.email as participant_email,
+                e.evaluation_data,
+                e.created_at
+            FROM evaluations e
+            JOIN participants p ON e.participant_id = p.id
+            ORDER BY e.created_at DESC, e.id DESC
+        """).fetchall()
+        return [
+            dict(row, evaluation_data={'ratings': _expand(conn, json.loads(row['evaluation_data']))})
+            for row in rows
+        ]
+    except Exception as e:
+        raise Exception(f"Error retrieving evaluations: {str(e)}")
+
+def get_rating_rows(after_evaluation_id=0, known_ids=()):
+    """Return one row per rating for evaluations with id > after_evaluation_id,
+    except the evaluations in known_ids"""
+    conn = get_db_connection()
+    try:
+        known_ids = list(known_ids)
+        rows = conn.execute(f"""
+            SELECT evaluation_id, participant_id, sample_type, sample_index, model_id, rating
+            FROM ratings
+            WHERE evaluation_id > ?
+              AND evaluation_id NOT IN ({','.join('?' * len(known_ids))})
+            ORDER BY evaluation_id
+        """, [after_evaluation_id] + known_ids).fetchall()
+        return [tuple(row) for row in rows]
+    except Exception as e:
+        raise Exception(f"Error retrieving ratings: {str(e)}")
+
+def iter_rating_export(itersize=None):
+    """Yield one row per rating, reading itersize rows at a time"""
+    itersize = itersize or int(os.getenv('EXPORT_ITERSIZE', '2000'))
+    get_db_connection()
+    # Separate connection so a long export does not hold this thread's one
+    conn = sqlite3.connect(_db_path(), timeout=30)
+    try:
+        cur = conn.execute("""
+            SELECT
+                r.evaluation_id,
+                r.participant_id,
+                e.created_at,
+                r.sample_type,
+                r.sample_index,
+                r.model_id,
+                r.model_name,
+                r.rating
+            FROM ratings r
+            JOIN evaluations e ON e.id = r.evaluation_id
+            ORDER BY r.evaluation_id
+        """)
+        while True:
+            rows = cur.fetchmany(itersize)
+            if not rows:
+                break
+            for row in rows:
+                created_at = datetime.fromisoformat(row[2]) if row[2] else None
+                yield row[:2] + (created_at,) + row[3:]
+    except Exception as e:
+        raise Exception(f"Error exporting ratings: {str(e)}")
+    finally:
+        conn.close()
+
+def get_evaluation_statistics():
+    """Get statistics about evaluations"""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("""
+            SELECT
+                model_id,
+                MAX(model_name) as model_name,
+                SUM(rating_count) as total_ratings,
+                SUM(rating_sum) as rating_sum,
+                SUM(rating_sum_sq) as rating_sum_sq,
+                MIN(rating_min) as min_rating,
+                MAX(rating_max) as max_rating
+            FROM rating_rollups
+            WHERE rating_count > 0
+            GROUP BY model_id
+            ORDER BY model_id
+        """).fetchall()
+
+        model_stats = []
+        for row in rows:
+            n = row['total_ratings']
+            variance = (row['rating_sum_sq'] - row['rating_sum'] ** 2 / n) / (n - 1) if n > 1 else 0
+            model_stats.append({
+                'model_id': row['model_id'],
+                'model_name': row['model_name'],
+                'total_ratings': n,
+                'average_rating': round(row['rating_sum'] / n, 2),
+                'stddev_rating': round(math.sqrt(max(variance, 0)), 2),
+                'min_rating': row['min_rating'],
+                'max_rating': row['max_rating'],
+            })
+
+        participant_count = conn.execute("SELECT COUNT(*) FROM participants").fetchone()[0]
+        evaluation_count = conn.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+
+        return {
+            'model_statistics': model_stats,
+            'total_participants': participant_count,
+            'total_evaluations': evaluation_count
+        }
+    except Exception as e:
+        raise Exception(f"Error retrieving statistics: {str(e)}")
+
+def rebuild_rating_rollups():
+    """Rebuild ratings and rating_rollups from every stored evaluation"""
+    conn = get_db_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM ratings")
+        conn.execute("""
+            INSERT INTO ratings
+            (evaluation_id, participant_id, sample_type, sample_index, model_id, model_name, rating)
+            SELECT
+                e.id,
+                e.participant_id,
+                json_extract(r.value, '$.sample_type'),
+                json_extract(r.value, '$.sample_index'),
+                json_extract(r.value, '$.model_id'),
+                json_extract(r.value, '$.model_name'),
+                json_extract(r.value, '$.rating')
+            FROM evaluations e, json_each(e.evaluation_data, '$.ratings') r
+            UNION ALL
+            SELECT
+                e.id,
+                e.participant_id,
+                m.sample_type,
+                m.sample_index,
+                m.model_id,
+                m.model_name,
+                r.value
+            FROM evaluations e
+            JOIN json_each(e.evaluation_data, '$.r') r
+            JOIN dataset_manifests m
+              ON m.version = json_extract(e.evaluation_data, '$.manifest') AND m.slot = r.key + 1
+            WHERE r.value <> 0
+        """)
+        conn.execute("DELETE FROM rating_rollups")
+        cur = conn.execute("""
+            INSERT INTO rating_rollups (
+                model_id, sample_type, sample_index, model_name,
+                rating_count, rating_sum, rating_sum_sq, rating_min, rating_max
+            )
+            SELECT
+                model_id, sample_type, sample_index, MAX(model_name),
+                COUNT(*), SUM(rating), SUM(rating * rating), MIN(rating), MAX(rating)
+            FROM ratings
+            GROUP BY model_id, sample_type, sample_index
+        """)
+        conn.execute("COMMIT")
+        return cur.rowcount
+    except Exception as e:
+        conn.execute("ROLLBACK")
+        raise Exception(f"Error rebuilding rating rollups: {str(e)}")
+
+def compact_evaluations(version, batch_size=1000):
+    """Rewrite legacy evaluation payloads compactly, see database.compact_evaluations"""
+    conn = get_db_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        slots = _manifest_slots(conn, version)
+        conn.execute("COMMIT")
+
+        converted = skipped = 0
+        after_id = 0
+        while True:
+            rows = conn.execute("""
+                SELECT id, evaluation_data FROM evaluations
+                WHERE id > ? AND json_type(evaluation_data, '$.ratings') IS NOT NULL
+                ORDER BY id
+                LIMIT ?
+            """, (after_id, batch_size)).fetchall()
+            if not rows:
+                break
+            after_id = rows[-1]['id']
+
+            updates = []
+            for row in rows:
+                compact = compact_evaluation(json.loads(row['evaluation_data']), version, slots)
+                if compact is None:
+                    skipped += 1
+                else:
+                    updates.append((json.dumps(compact, separators=(',', ':')), row['id']))
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("UPDATE evaluations SET evaluation_data = ? WHERE id = ?", updates)
+            conn.execute("COMMIT")
+            converted += len(updates)
+
+        return converted, skipped
+    except Exception as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise Exception(f"Error compacting evaluations: {str(e)}")
+
+def check_participant_exists(email):
+    """Check if participant with email already exists"""
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT id, name FROM participants WHERE email = ?", (email,)).fetchone()
+        return tuple(row) if row else None
+    except Exception as e:
+        raise Exception(f"Error checking participant: {str(e)}")
+
+def ping():
+    """Round trip to the database (health check); raises when it is unreachable"""
+    conn = get_db_connection()
+    try:
+        conn.execute("SELECT 1").fetchone()
+    except Exception as e:
+        raise Exception(f"Error pinging database: {str(e)}")
+
+# Participant names as shown on the Statistik page: first and last letter kept
+_MASKED_NAME = """
+    CASE WHEN length(p.name) <= 2
+         THEN substr(p.name, 1, 1) || replace(hex(zeroblob(length(p.name) - 1)), '00', '*')
+         ELSE substr(p.name, 1, 1) || replace(hex(zeroblob(length(p.name) - 2)), '00', '*') || substr(p.name, -1)
+    END
+"""
+
+def get_participants_page(after=None, limit=50):
+    """Return up to limit participants, newest first, see database.get_participants_page"""
+    conn = get_db_connection()
+    try:
+        keyset = "WHERE (p.created_at, p.id) < (?, ?)" if after else ""
+        rows = conn.execute("""
+            SELECT
+                p.id,
+                """ + _MASKED_NAME + """ as name,
+                p.created_at,
+                (
+                    SELECT COUNT(*) FROM evaluations e
+                    WHERE e.participant_id = p.id
+                ) as total_evaluations
+            FROM participants p
+            """ + keyset + """
+            ORDER BY p.created_at DESC, p.id DESC
+            LIMIT ?
+        """, (tuple(after) if after else ()) + (limit,)).fetchall()
+        return [dict(row) for row in rows]
+    except Exception as e:
+        raise Exception(f"Error retrieving participants: {str(e)}")
@@ -0,0 +1,127 @@
+"""
+Process start-up: settings, deferred imports and warm-up.
+
+Heavy modules (pandas, numpy, pyarrow, the database driver) are imported
+where they are first needed, and .env is loaded by load_env() on first use of
+a setting rather than as a side effect of importing database.py. warm_up()
+does the first-request work up front: it imports the deferred modules,
+compiles the dataset index, opens the database connection (applying pending
+schema migrations), builds the audio index and fills the audio and
+statistics caches. Every step is timed; timings are printed and reported as
+startup_<step> gauges (seconds) in metrics.py.
+
+serve.py runs warm_up() before Streamlit accepts connections. Under a plain
+`streamlit run main.py` the first session starts it in a background thread.
+"""
+
+import importlib
+import os
+import threading
+import time
+from metrics import register_collector
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Modules the pages import lazily, loaded here so no request pays for them
+WARM_IMPORTS = ('streamlit', 'pandas', 'numpy', 'ratings_cube')
+
+_env_loaded = False
+_timings = {}
+_warm_up_lock = threading.Lock()
+_warm_up_started = False
+
+def load_env():
+    """Load .env into os.environ once (variables already set take precedence)"""
+    global _env_loaded
+    if _env_loaded:
+        return
+    start = time.perf_counter()
+    from dotenv import find_dotenv, load_dotenv
+    # .env of the working directory (or a parent), else the repository's
+    load_dotenv(find_dotenv(usecwd=True) or os.path.join(ROOT, '.env'))
+    _env_loaded = True
+    _timings.setdefault('env', time.perf_counter() - start)
+
+def _warm_imports():
+    for name in WARM_IMPORTS:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        _timings[f'import_{name}'] = time.perf_counter() - start
+
+def _warm_dataset():
+    from dataset_index import load_dataset_index
+    load_dataset_index()
+
+def _warm_database():
+    # First connection (pool creation) and pending schema migrations
+    from storage import init_database
+    init_database()
+
+def _warm_audio():
+    from audio_cache import audio_url, get_audio_index, load_audio
+    from dataset_index import load_dataset_index
+    index = load_dataset_index()
+    get_audio_index()
+    if os.getenv('AUDIO_BASE_URL'):
+        # Content hashes of the static URLs
+        for path in index.audio_paths():
+            if get_audio_index()[path]['exists']:
+                audio_url(path)
+        return
+    samples = index.iter_samples()
+    page_size = int(os.getenv('FORM_PAGE_SIZE', '0'))
+    if page_size > 0:
+        samples = samples[:page_size]
+    load_audio(path for _, sample in samples for path in sample.audio_paths())
+
+def _warm_statistics():
+    from significance import get_significance
+    from stats_cache import get_cached_statistics
+    get_cached_statistics()
+    # Loads the ratings cube, then the intervals and tests over it
+    get_significance()
+
+WARM_UP_STEPS = (
+    ('imports', _warm_imports),
+    ('dataset', _warm_dataset),
+    ('database', _warm_database),
+    ('audio', _warm_audio),
+    ('statistics', _warm_statistics),
+)
+
+def warm_up():
+    """Run every warm-up step; returns the timings in seconds"""
+    global _warm_up_started
+    with _warm_up_lock:
+        _warm_up_started = True
+    load_env()
+    total_start = time.perf_counter()
+    for name, step in WARM_UP_STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            # Best effort: the app still handles a failing dependency per request
+            print(f"Warm-up step {name} failed: {str(e)}")
+        _timings[name] = time.perf_counter() - start
+    _timings['total'] = time.perf_counter() - total_start
+
+    print("Warm-up timings: " + ", ".join(
+        f"{name} {seconds * 1000:.0f} ms" for name, seconds in _timings.items()
+    ))
+    return dict(_timings)
+
+def start_warm_up():
+    """Run warm_up() in a background thread unless it already ran in this process"""
+    global _warm_up_started
+    with _warm_up_lock:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+def get_startup_timings():
+    """Import and warm-up timings in seconds"""
+    return dict(_timings)
+
+register_collector('startup', get_startup_timings)
@@ -0,0 +1,125 @@
+"""
+In-process cache for the statistics queries.
+
+Results are kept for STATS_CACHE_TTL seconds and dropped as soon as any
+replica commits a new evaluation: database.py fires a NOTIFY on
+EVALUATIONS_CHANNEL with every submission and a background thread in each
+process LISTENs for it. Writes made by this process (the only writer with
+the SQLite backend) invalidate the cache directly.
+"""
+
+import os
+import select
+import threading
+import time
+import storage
+from metrics import register_collector
+from storage import get_evaluation_statistics, get_participants_page
+
+_cache = {}
+_lock = threading.Lock()
+_generation = 0
+_listener = None
+_invalidation_callbacks = []
+_listener_lock = threading.Lock()
+_cache_stats = {
+    'hits': 0,
+    'misses': 0,
+    'invalidations': 0,
+    'listener_connected': False,
+}
+
+def invalidate():
+    """Drop every cached result"""
+    global _generation
+    with _lock:
+        _generation += 1
+        _cache.clear()
+        _cache_stats['invalidations'] += 1
+    for callback in _invalidation_callbacks:
+        callback()
+
+def on_invalidate(callback):
+    """Call callback() whenever the cache is invalidated"""
+    _invalidation_callbacks.append(callback)
+
+def _listen_forever():
+    """Invalidate the cache on every notification, reconnecting on errors"""
+    from database import EVALUATIONS_CHANNEL, get_db_connection
+
+    backoff = 1
+    while True:
+        conn = None
+        try:
+            conn = get_db_connection()
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {EVALUATIONS_CHANNEL}")
+            _cache_stats['listener_connected'] = True
+            backoff = 1
+            # Anything committed while we were disconnected was missed
+            invalidate()
+
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                if conn.notifies:
+                    conn.notifies.clear()
+                    invalidate()
+        except Exception as e:
+            print(f"Statistics cache listener error: {str(e)}")
+        finally:
+            _cache_stats['listener_connected'] = False
+            if conn is not None:
+                conn.close()
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 60)
+
+def start_listener():
+    """Start the LISTEN thread once per process (Postgres only)"""
+    global _listener
+    with _listener_lock:
+        if _listener is None and storage.backend_name() == 'postgres':
+            _listener = threading.Thread(
+                target=_listen_forever, name="stats-cache-listener", daemon=True
+            )
+            _listener.start()
+
+def _cached(name, loader):
+    """Return the cached result of loader(), reloading when stale"""
+    start_listener()
+    ttl = float(os.getenv('STATS_CACHE_TTL', '60'))
+
+    with _lock:
+        entry = _cache.get(name)
+        if entry and time.monotonic() - entry[0] < ttl:
+            _cache_stats['hits'] += 1
+            return entry[1]
+        _cache_stats['misses'] += 1
+        generation = _generation
+
+    value = loader()
+
+    with _lock:
+        # Don't store a result that an invalidation raced past
+        if generation == _generation:
+            _cache[name] = (time.monotonic(), value)
+    return value
+
+storage.subscribe(invalidate)
+
+def get_cached_statistics():
+    """Cached get_evaluation_statistics()"""
+    return _cached('statistics', get_evaluation_statistics)
+
+def get_cached_participants_page(after=None, limit=50):
+    """Cached get_participants_page(), one entry per visited page"""
+    return _cached(('participants', after, limit), lambda: get_participants_page(after, limit))
+
+def get_cache_stats():
+    """Return cache hit/miss counters"""
+    with _lock:
+        return dict(_cache_stats, entries=len(_cache))
+
+register_collector('stats_cache', get_cache_stats)
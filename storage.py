@@ -0,0 +1,131 @@
+"""
+Storage interface used by the app.
+
+STORAGE_BACKEND selects the implementation: "postgres" (default, database.py)
+or "sqlite" (sqlite_database.py, embedded, WAL mode). Both modules implement
+the functions below with identical signatures and return shapes. Every call
+is timed under "db.<function>" (see metrics.py). Write functions also notify
+in-process subscribers (see stats_cache.py), which is how single-node SQLite
+deployments invalidate cached statistics.
+"""
+
+import importlib
+import os
+from functools import lru_cache
+from metrics import timed
+from startup import load_env
+
+BACKENDS = {
+    'postgres': 'database',
+    'sqlite': 'sqlite_database',
+}
+
+_subscribers = []
+
+def backend_name():
+    """Name of the configured backend"""
+    load_env()
+    name = os.getenv('STORAGE_BACKEND', 'postgres').lower()
+    if name not in BACKENDS:
+        raise Exception(f"Unknown STORAGE_BACKEND: {name}")
+    return name
+
+@lru_cache(maxsize=None)
+def _load_backend(name):
+    return importlib.import_module(BACKENDS[name])
+
+def get_backend():
+    """Return the module implementing the configured backend"""
+    return _load_backend(backend_name())
+
+def subscribe(callback):
+    """Call callback() after every successful write in this process"""
+    _subscribers.append(callback)
+
+def _changed():
+    for callback in _subscribers:
+        callback()
+
+@timed('db.init_database')
+def init_database():
+    return get_backend().init_database()
+
+@timed('db.submit_evaluation')
+def submit_evaluation(name, email, evaluation_data, allow_duplicate=False):
+    result = get_backend().submit_evaluation(name, email, evaluation_data, allow_duplicate)
+    if result[0] is not None:
+        _changed()
+    return result
+
+@timed('db.submit_evaluations_batch')
+def submit_evaluations_batch(submissions):
+    inserted = get_backend().submit_evaluations_batch(submissions)
+    if inserted:
+        _changed()
+    return inserted
+
+@timed('db.save_draft')
+def save_draft(token, name, email, changed_ratings):
+    return get_backend().save_draft(token, name, email, changed_ratings)
+
+@timed('db.get_draft')
+def get_draft(token):
+    return get_backend().get_draft(token)
+
+@timed('db.promote_draft')
+def promote_draft(token, name, email, changed_ratings, manifest_version, allow_duplicate=False):
+    result = get_backend().promote_draft(token, name, email, changed_ratings, manifest_version, allow_duplicate)
+    if result[0] is not None:
+        _changed()
+    return result
+
+@timed('db.save_participant')
+def save_participant(name, email):
+    return get_backend().save_participant(name, email)
+
+@timed('db.save_evaluation')
+def save_evaluation(participant_id, evaluation_data):
+    get_backend().save_evaluation(participant_id, evaluation_data)
+    _changed()
+
+@timed('db.assign_samples')
+def assign_samples(token, pool, count, quotas):
+    return get_backend().assign_samples(token, pool, count, quotas)
+
+@timed('db.check_participant_exists')
+def check_participant_exists(email):
+    return get_backend().check_participant_exists(email)
+
+@timed('db.ping')
+def ping():
+    return get_backend().ping()
+
+@timed('db.get_rating_rows')
+def get_rating_rows(after_evaluation_id=0, known_ids=()):
+    return get_backend().get_rating_rows(after_evaluation_id, known_ids)
+
+# Not timed here: the rows are produced lazily (export.py times the export)
+def iter_rating_export(itersize=None):
+    return get_backend().iter_rating_export(itersize)
+
+@timed('db.get_evaluation_statistics')
+def get_evaluation_statistics():
+    return get_backend().get_evaluation_statistics()
+
+@timed('db.get_participants_page')
+def get_participants_page(after=None, limit=50):
+    return get_backend().get_participants_page(after, limit)
+
+@timed('db.get_all_evaluations')
+def get_all_evaluations():
+    return get_backend().get_all_evaluations()
+
+@timed('db.compact_evaluations')
+def compact_evaluations(version, batch_size=1000):
+    return get_backend().compact_evaluations(version, batch_size)
+
+@timed('db.rebuild_rating_rollups')
+def rebuild_rating_rollups():
+    rows = get_backend().rebuild_rating_rollups()
+    _changed()
+    return rows
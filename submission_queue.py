@@ -0,0 +1,250 @@
+"""
+Durable write-behind queue for form submissions.
+
+enqueue_submission() appends the submission to a local SQLite spool and
+returns as soon as it is on disk. A background worker flushes the spool to
+the database in batches through storage.submit_evaluations_batch(),
+retrying with backoff while the database is unreachable. Every submission
+carries an idempotency key, so a batch that is retried after a partial
+failure is never written twice. When a batch fails while the database is up,
+its rows are retried one at a time so the good ones still go through; a row
+that fails SUBMISSION_MAX_ATTEMPTS times is moved to the dead_letter table.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataset_index import archive_manifest, is_compact
+from storage import ping, submit_evaluations_batch
+from metrics import register_collector
+
+_worker = None
+# Guards _worker and _queue_stats (updated by the flush thread and request threads)
+_worker_lock = threading.Lock()
+_wakeup = threading.Event()
+_queue_stats = {
+    'enqueued': 0,
+    'flushed': 0,
+    'batches': 0,
+    'failures': 0,
+    'dead_lettered': 0,
+    'last_error': None,
+}
+
+def _spool_path():
+    return os.getenv('SUBMISSION_SPOOL_PATH', 'submission_spool.sqlite3')
+
+def _connect():
+    conn = sqlite3.connect(_spool_path(), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS spool (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            submission_key TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            evaluation_data TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dead_letter (
+            id INTEGER PRIMARY KEY,
+            submission_key TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            evaluation_data TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            attempts INTEGER NOT NULL,
+            last_error TEXT,
+            failed_at REAL NOT NULL
+        )
+    """)
+    return conn
+
+def enqueue_submission(name, email, evaluation_data):
+    """Durably spool a submission and return its idempotency key"""
+    submission_key = uuid.uuid4().hex
+    conn = _connect()
+    try:
+        if is_compact(evaluation_data):
+            # The flush may run after final_dataset.json changed; fails here,
+            # before acknowledging, if the manifest is unknown
+            archive_manifest(evaluation_data['manifest'])
+        with conn:
+            conn.execute(
+                "INSERT INTO spool (submission_key, name, email, evaluation_data, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (submission_key, name, email, json.dumps(evaluation_data), time.time())
+            )
+    except Exception as e:
+        raise Exception(f"Error queueing evaluation: {str(e)}")
+    finally:
+        conn.close()
+
+    with _worker_lock:
+        _queue_stats['enqueued'] += 1
+    start_worker()
+    _wakeup.set()
+    return submission_key
+
+def _submission(row):
+    _, key, name, email, data = row
+    return {'submission_key': key, 'name': name, 'email': email, 'evaluation_data': json.loads(data)}
+
+def _database_reachable():
+    try:
+        ping()
+        return True
+    except Exception:
+        return False
+
+def _record_failures(conn, failures):
+    """Count a failed attempt per row; move rows out of attempts to dead_letter"""
+    max_attempts = int(os.getenv('SUBMISSION_MAX_ATTEMPTS', '5'))
+    with conn:
+        conn.executemany(
+            "UPDATE spool SET attempts = attempts + 1, last_error = ? WHERE id = ?",
+            [(error, row_id) for row_id, error in failures]
+        )
+        dead = conn.execute(
+            "SELECT id FROM spool WHERE attempts >= ? AND id IN (%s)" % ",".join("?" * len(failures)),
+            [max_attempts] + [row_id for row_id, _ in failures]
+        ).fetchall()
+        for (row_id,) in dead:
+            conn.execute(
+                "INSERT OR REPLACE INTO dead_letter "
+                "SELECT id, submission_key, name, email, evaluation_data, created_at, attempts, last_error, ? "
+                "FROM spool WHERE id = ?",
+                (time.time(), row_id)
+            )
+            conn.execute("DELETE FROM spool WHERE id = ?", (row_id,))
+    for (row_id,) in dead:
+        print(f"Submission {row_id} moved to dead_letter after {max_attempts} failed attempts")
+    with _worker_lock:
+        _queue_stats['dead_lettered'] += len(dead)
+
+def flush_once(batch_size=None):
+    """Send one batch from the spool to the database; return rows flushed"""
+    batch_size = batch_size or int(os.getenv('SUBMISSION_BATCH_SIZE', '100'))
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT id, submission_key, name, email, evaluation_data "
+            "FROM spool ORDER BY id LIMIT ?",
+            (batch_size,)
+        ).fetchall()
+        if not rows:
+            return 0
+
+        try:
+            submit_evaluations_batch([_submission(row) for row in rows])
+            written, failures = rows, []
+        except Exception as e:
+            if not _database_reachable():
+                # Outage: not the rows' fault, back off and retry the batch
+                raise
+            # A bad row fails the whole batch: retry one at a time
+            written, failures = [], []
+            for row in rows:
+                try:
+                    submit_evaluations_batch([_submission(row)])
+                    written.append(row)
+                except Exception as row_error:
+                    failures.append((row[0], str(row_error)))
+            if failures and not written and not _database_reachable():
+                raise e
+
+        # Only forget rows once the database has committed them
+        if written:
+            with conn:
+                conn.executemany("DELETE FROM spool WHERE id = ?", [(row[0],) for row in written])
+            with _worker_lock:
+                _queue_stats['flushed'] += len(written)
+                _queue_stats['batches'] += 1
+        if failures:
+            with _worker_lock:
+                _queue_stats['failures'] += len(failures)
+                _queue_stats['last_error'] = failures[-1][1]
+            _record_failures(conn, failures)
+        return len(written)
+    finally:
+        conn.close()
+
+def requeue_dead_letters():
+    """Move every dead-lettered submission back to the spool; return how many"""
+    conn = _connect()
+    try:
+        with conn:
+            moved = conn.execute(
+                "INSERT INTO spool (id, submission_key, name, email, evaluation_data, created_at, attempts, last_error) "
+                "SELECT id, submission_key, name, email, evaluation_data, created_at, 0, last_error FROM dead_letter"
+            ).rowcount
+            conn.execute("DELETE FROM dead_letter")
+        return moved
+    finally:
+        conn.close()
+
+def _flush_forever():
+    backoff = 1
+    interval = float(os.getenv('SUBMISSION_FLUSH_SECONDS', '2'))
+    while True:
+        # Wait a little after a wakeup so bursts coalesce into one batch
+        _wakeup.wait(timeout=interval)
+        time.sleep(interval if _wakeup.is_set() else 0)
+        _wakeup.clear()
+        try:
+            while flush_once():
+                pass
+            backoff = 1
+        except Exception as e:
+            with _worker_lock:
+                _queue_stats['failures'] += 1
+                _queue_stats['last_error'] = str(e)
+            print(f"Submission queue flush failed, retrying in {backoff}s: {str(e)}")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+def start_worker():
+    """Start the flush thread once per process"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_flush_forever, name="submission-flusher", daemon=True)
+            _worker.start()
+
+def get_queue_stats():
+    """Return queue counters and the current spool depth"""
+    conn = _connect()
+    try:
+        pending = conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+        dead = conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+    finally:
+        conn.close()
+    with _worker_lock:
+        return dict(_queue_stats, pending=pending, dead=dead)
+
+register_collector('submission_queue', get_queue_stats)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drain the submission spool")
+    parser.add_argument('--requeue-dead', action='store_true', help="retry dead-lettered submissions first")
+    args = parser.parse_args()
+    if args.requeue_dead:
+        print(f"Requeued {requeue_dead_letters()} dead-lettered submissions")
+
+    # Drain the spool once, e.g. before shutting a replica down
+    total = 0
+    while True:
+        flushed = flush_once()
+        if not flushed:
+            break
+        total += flushed
+    print(f"Flushed {total} queued submissions")
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture
+def sqlite_backend(tmp_path, monkeypatch):
+    """Point storage at a fresh SQLite database in tmp_path"""
+    monkeypatch.setenv('STORAGE_BACKEND', 'sqlite')
+    monkeypatch.setenv('SQLITE_PATH', str(tmp_path / 'test.sqlite3'))
+    monkeypatch.chdir(ROOT)
+    import storage
+    storage.init_database()
+    return storage
@@ -0,0 +1,51 @@
+import os
+
+import audio_cache
+import audio_server
+import startup
+import transcode_audio
+from conftest import ROOT
+from dataset_index import load_dataset_index
+
+ENV_KEYS = ('AUDIO_FORMAT_PREFERENCE', 'AUDIO_SERVER_HOST', 'AUDIO_SERVER_PORT', 'AUDIO_BASE_URL')
+
+def test_server_reads_env_file_and_serves_the_apps_variant(tmp_path, monkeypatch):
+    # Dataset and audio are relative to the working directory
+    os.symlink(os.path.join(ROOT, 'final_dataset.json'), tmp_path / 'final_dataset.json')
+    os.symlink(os.path.join(ROOT, 'audios'), tmp_path / 'audios')
+    (tmp_path / '.env').write_text(
+        "AUDIO_FORMAT_PREFERENCE=mp3,opus\n"
+        "AUDIO_SERVER_HOST=0.0.0.0\n"
+        "AUDIO_SERVER_PORT=9123\n"
+        "AUDIO_BASE_URL=http://audio.test\n"
+    )
+    monkeypatch.chdir(tmp_path)
+    for key in ENV_KEYS:
+        # Restored to unset afterwards even though load_env() sets them
+        monkeypatch.setenv(key, '')
+        monkeypatch.delenv(key)
+    monkeypatch.setattr(startup, '_env_loaded', False)
+    monkeypatch.setattr(audio_cache, '_index', None)
+
+    # One clip transcoded to both formats
+    path = next(iter(load_dataset_index().audio_paths()))
+    variants = []
+    for fmt, mime in (('opus', 'audio/ogg'), ('mp3', 'audio/mpeg')):
+        variant = tmp_path / f'clip.{fmt}'
+        variant.write_bytes(fmt.encode() * 100)
+        variants.append({'format': fmt, 'path': str(variant), 'mime': mime})
+    monkeypatch.setattr(transcode_audio, 'load_manifest', lambda: {'files': {path: {'variants': variants}}})
+
+    served = {}
+    monkeypatch.setattr(audio_server, 'serve', lambda host, port, routes: served.update(
+        host=host, port=port, routes=routes
+    ))
+    audio_server.main([])
+
+    assert served['host'] == '0.0.0.0'
+    assert served['port'] == 9123
+    # The URL the app links to is routed to the preferred (mp3) variant
+    url, mime = audio_cache.audio_url(path)
+    assert mime == 'audio/mpeg'
+    file_path, _, _, _ = served['routes'][url[len('http://audio.test'):]]
+    assert file_path == str(tmp_path / 'clip.mp3')
@@ -0,0 +1,25 @@
+import csv
+import io
+
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from dataset_index import load_dataset_index
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+def test_download_data_is_accepted_by_streamlit(sqlite_backend, fmt):
+    from export import export_bytes
+
+    index = load_dataset_index()
+    ratings = dict.fromkeys(index.rating_keys, 4)
+    sqlite_backend.submit_evaluation('Uji', 'uji@example.com', index.encode_ratings(ratings))
+
+    # What st.download_button does with the deferred data of the Statistik page
+    data, _ = convert_data_to_bytes_and_infer_mime(export_bytes(fmt), Exception("unsupported"))
+
+    if fmt == 'csv':
+        rows = list(csv.reader(io.StringIO(data.decode())))
+        assert rows[0][0] == 'evaluation_id'
+        assert len(rows) == len(index.rating_keys) + 1
+    else:
+        assert data[:4] == b'PAR1'
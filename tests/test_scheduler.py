@@ -0,0 +1,38 @@
+from collections import Counter
+from itertools import combinations
+
+from scheduler import language_quotas
+
+def assign_sessions(storage, pool_sizes, k, sessions):
+    pool = [(sample_type, index) for sample_type, size in pool_sizes.items() for index in range(size)]
+    quotas = language_quotas(pool_sizes, k)
+    counts = Counter(dict.fromkeys(pool, 0))
+    pairs = Counter(dict.fromkeys(combinations(sorted(pool), 2), 0))
+    for session in range(sessions):
+        samples = storage.assign_samples(f'token-{session}', pool, k, quotas)
+        assert len(set(samples)) == k
+        for sample_type, quota in quotas.items():
+            assert sum(1 for sample in samples if sample[0] == sample_type) >= quota
+        counts.update(samples)
+        pairs.update(combinations(sorted(samples), 2))
+    return counts, pairs
+
+def spread(counter):
+    return max(counter.values()) - min(counter.values())
+
+def test_per_sample_counts_stay_within_one(sqlite_backend):
+    counts, _ = assign_sessions(sqlite_backend, {'sunda': 12, 'jawa': 5}, 5, 60)
+    assert spread(counts) <= 1
+
+def test_pairs_are_spread_like_a_block_design(sqlite_backend):
+    # v=7, k=3 admits a BIBD (the Fano plane, every pair once per 7 blocks),
+    # so 70 blocks would put every pair together exactly 10 times
+    counts, pairs = assign_sessions(sqlite_backend, {'sunda': 7}, 3, 70)
+    assert spread(counts) == 0
+    assert sum(pairs.values()) / len(pairs) == 10
+    assert spread(pairs) <= 2
+
+def test_reload_keeps_the_assignment(sqlite_backend):
+    pool = [('sunda', index) for index in range(10)]
+    first = sqlite_backend.assign_samples('token', pool, 4, {'sunda': 4})
+    assert sqlite_backend.assign_samples('token', pool, 4, {'sunda': 4}) == first
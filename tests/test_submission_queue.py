@@ -0,0 +1,65 @@
+import pytest
+
+import dataset_index
+import submission_queue
+from dataset_index import load_dataset_index
+
+@pytest.fixture
+def spool(sqlite_backend, tmp_path, monkeypatch):
+    monkeypatch.setenv('SUBMISSION_SPOOL_PATH', str(tmp_path / 'spool.sqlite3'))
+    monkeypatch.setattr(dataset_index, 'MANIFEST_ARCHIVE_DIR', str(tmp_path / 'manifests'))
+    monkeypatch.setattr(submission_queue, 'start_worker', lambda: None)
+    return submission_queue
+
+def test_failing_submission_is_dead_lettered_without_blocking_others(spool, monkeypatch):
+    index = load_dataset_index()
+    good = index.encode_ratings(dict.fromkeys(index.rating_keys, 4))
+    spool.enqueue_submission('A', 'a@example.com', good)
+    # Spooled before unknown manifests were rejected at enqueue time
+    with monkeypatch.context() as m:
+        m.setattr(spool, 'archive_manifest', lambda version: None)
+        spool.enqueue_submission('B', 'b@example.com', dict(good, manifest='unknown'))
+    spool.enqueue_submission('C', 'c@example.com', good)
+
+    flushed = [spool.flush_once() for _ in range(6)]
+
+    stats = spool.get_queue_stats()
+    assert sum(flushed) == 2
+    assert stats['pending'] == 0
+    assert stats['dead'] == 1
+    assert spool.requeue_dead_letters() == 1
+
+def test_outage_does_not_count_attempts(spool, monkeypatch):
+    index = load_dataset_index()
+    spool.enqueue_submission('A', 'a@example.com', index.encode_ratings(dict.fromkeys(index.rating_keys, 4)))
+
+    def unreachable(*args):
+        raise Exception("connection refused")
+    monkeypatch.setattr(spool, 'submit_evaluations_batch', unreachable)
+    monkeypatch.setattr(spool, 'ping', unreachable)
+
+    for _ in range(10):
+        with pytest.raises(Exception):
+            spool.flush_once()
+
+    stats = spool.get_queue_stats()
+    assert stats['pending'] == 1
+    assert stats['dead'] == 0
+
+def test_unknown_manifest_is_rejected_before_spooling(spool):
+    with pytest.raises(Exception, match="Unknown dataset version"):
+        spool.enqueue_submission('A', 'a@example.com', {'v': 2, 'manifest': 'unknown', 'r': [4]})
+    assert spool.get_queue_stats()['pending'] == 0
+
+def test_spooled_submission_survives_a_dataset_change(spool, monkeypatch):
+    index = load_dataset_index()
+    spool.enqueue_submission('A', 'a@example.com', index.encode_ratings(dict.fromkeys(index.rating_keys, 4)))
+
+    # final_dataset.json rebuilt before the flush: the spooled version is no
+    # longer the current one
+    monkeypatch.setattr(dataset_index, 'load_dataset_index', lambda path=None: index.__class__(
+        'rebuilt', index.samples, index.rating_keys
+    ))
+
+    assert spool.flush_once() == 1
+    assert spool.get_queue_stats()['dead'] == 0
@@ -0,0 +1,175 @@
+"""
+Transcode every audio file referenced by final_dataset.json into compressed
+variants (Opus and/or MP3) and write a manifest with sizes and hashes.
+
+Usage:
+    python transcode_audio.py [--formats opus:24k,mp3:32k] [--workers N] [--force]
+
+Requires ffmpeg on PATH. Files whose content hash is unchanged since the last
+run are skipped. main.py serves the compressed variant when the manifest lists
+one and falls back to the original WAV otherwise.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from dataset_index import DATASET_PATH, load_dataset_index
+
+OUTPUT_DIR = 'audios_compressed'
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, 'manifest.json')
+DEFAULT_FORMATS = 'opus:24k,mp3:32k'
+
+# Output extension, ffmpeg codec arguments and MIME type for each format
+FORMATS = {
+    'opus': ('.ogg', ['-c:a', 'libopus', '-application', 'audio'], 'audio/ogg'),
+    'mp3': ('.mp3', ['-c:a', 'libmp3lame'], 'audio/mpeg'),
+}
+
+def file_sha256(path):
+    """Return the hex SHA-256 of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def parse_formats(spec):
+    """Parse 'opus:24k,mp3:32k' into [('opus', '24k'), ('mp3', '32k')]"""
+    formats = []
+    for item in spec.split(','):
+        name, _, bitrate = item.strip().partition(':')
+        if name not in FORMATS:
+            raise ValueError(f"Unsupported format: {name}")
+        formats.append((name, bitrate or '32k'))
+    return formats
+
+def dataset_audio_paths(dataset_path=DATASET_PATH):
+    """Return every distinct audio path referenced by the dataset"""
+    return list(load_dataset_index(dataset_path).audio_paths())
+
+def variant_path(source, fmt, bitrate):
+    """Output path of one compressed variant of source"""
+    relative = os.path.normpath(source)
+    if relative.startswith('audios' + os.sep):
+        relative = relative[len('audios' + os.sep):]
+    base, _ = os.path.splitext(relative)
+    return os.path.join(OUTPUT_DIR, f"{base}.{bitrate}{FORMATS[fmt][0]}")
+
+def transcode_file(source, formats):
+    """Transcode one file into every requested variant (runs in a worker)"""
+    entry = {
+        'sha256': file_sha256(source),
+        'size': os.path.getsize(source),
+        'variants': [],
+    }
+    for fmt, bitrate in formats:
+        target = variant_path(source, fmt, bitrate)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        subprocess.run(
+            ['ffmpeg', '-nostdin', '-loglevel', 'error', '-y', '-i', source,
+             *FORMATS[fmt][1], '-b:a', bitrate, target],
+            check=True
+        )
+        entry['variants'].append({
+            'format': fmt,
+            'bitrate': bitrate,
+            'mime': FORMATS[fmt][2],
+            'path': target,
+            'size': os.path.getsize(target),
+            'sha256': file_sha256(target),
+        })
+    return source, entry
+
+def _is_current(entry, source, formats):
+    """True if the manifest entry matches the source content and formats"""
+    if not entry or entry.get('sha256') != file_sha256(source):
+        return False
+    done = {(v['format'], v['bitrate']) for v in entry.get('variants', [])
+            if os.path.exists(v['path'])}
+    return all(f in done for f in formats)
+
+def read_manifest(path=MANIFEST_PATH):
+    """Read the manifest, or return an empty one"""
+    if not os.path.exists(path):
+        return {'files': {}}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def transcode_all(formats, workers=None, force=False):
+    """Transcode every dataset file that changed since the last run"""
+    manifest = read_manifest()
+    files = manifest.setdefault('files', {})
+    sources = dataset_audio_paths()
+
+    missing = [p for p in sources if not os.path.exists(p)]
+    for path in missing:
+        print(f"⚠️ Missing source file: {path}")
+        files.pop(path, None)
+
+    todo = [p for p in sources if p not in missing
+            and (force or not _is_current(files.get(p), p, formats))]
+    print(f"{len(sources)} files referenced, {len(todo)} to transcode")
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = {executor.submit(transcode_file, p, formats): p for p in todo}
+        for future in as_completed(futures):
+            try:
+                source, entry = future.result()
+                files[source] = entry
+            except Exception as e:
+                failed += 1
+                print(f"❌ {futures[future]}: {str(e)}")
+
+    manifest['formats'] = [f"{fmt}:{bitrate}" for fmt, bitrate in formats]
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    converted = [e for e in files.values() if e['variants']]
+    original = sum(e['size'] for e in converted)
+    compressed = sum(min(v['size'] for v in e['variants']) for e in converted)
+    print(f"✅ Manifest written to {MANIFEST_PATH}")
+    if compressed:
+        print(f"Original {original / 1e6:.1f} MB -> smallest variants {compressed / 1e6:.1f} MB "
+              f"({original / compressed:.1f}x smaller)")
+    return failed
+
+@lru_cache(maxsize=1)
+def load_manifest():
+    """Manifest loaded once per process (empty when not generated yet)"""
+    try:
+        return read_manifest()
+    except Exception as e:
+        print(f"Could not read audio manifest: {str(e)}")
+        return {'files': {}}
+
+def compressed_variant(path):
+    """Return (path, mime) of the preferred compressed variant, or the WAV"""
+    entry = load_manifest()['files'].get(path)
+    if entry:
+        preference = os.getenv('AUDIO_FORMAT_PREFERENCE', 'opus,mp3').split(',')
+        variants = sorted(
+            entry['variants'],
+            key=lambda v: preference.index(v['format']) if v['format'] in preference else len(preference)
+        )
+        for variant in variants:
+            if os.path.exists(variant['path']):
+                return variant['path'], variant['mime']
+    return path, 'audio/wav'
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcode dataset audio into compressed variants")
+    parser.add_argument('--formats', default=DEFAULT_FORMATS,
+                        help="comma separated format:bitrate list (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument('--force', action='store_true', help="transcode even unchanged files")
+    args = parser.parse_args()
+
+    sys.exit(1 if transcode_all(parse_formats(args.formats), args.workers, args.force) else 0)